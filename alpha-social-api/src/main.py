@@ -6,9 +6,26 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask, send_from_directory, jsonify
 from flask_cors import CORS
 from src.models.user import db
+from src.models.schema import ensure_schema
 from src.routes.user import user_bp
 from src.routes.content import content_bp
 from src.routes.social import social_bp
+from src.routes.events import events_bp
+from src.routes.transactions import transactions_bp
+from src.models.view_counter import view_counter
+from src.models.search import search_index
+from src.models.trending import trending_engine
+from src.models.timeline import home_timeline
+from src.models.counters import stat_counters
+from src.models.serialization import content_serializer
+from src.models.cache import content_cache
+from src.models.membership import membership_index
+from src.models.user_stats import user_stats
+from src.models.conversations import conversation_summaries
+from src.models.events import event_bus
+from src.models.graph import follow_graph
+from src.models.outbox import tx_outbox
+from src.models.blockchain import blockchain_client
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'alpha_social_secret_key_2025'
@@ -20,15 +37,61 @@ CORS(app, origins="*")
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(content_bp, url_prefix='/api')
 app.register_blueprint(social_bp, url_prefix='/api')
+app.register_blueprint(events_bp, url_prefix='/api')
+app.register_blueprint(transactions_bp, url_prefix='/api')
 
 # 数据库配置
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'DATABASE_URL', f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 
-# 创建数据库表
+# 创建数据库表及索引
 with app.app_context():
-    db.create_all()
+    ensure_schema()
+
+# 内容全文检索索引
+search_index.init_app(app)
+
+# 浏览计数写回缓冲
+view_counter.init_app(app)
+
+# 热门内容榜单
+trending_engine.init_app(app)
+
+# 首页关注时间线
+home_timeline.init_app(app)
+
+# 全局统计计数
+stat_counters.init_app(app)
+
+# 内容列表序列化
+content_serializer.init_app(app)
+
+# 单条内容缓存
+content_cache.init_app(app)
+
+# 点赞、关注关系成员索引
+membership_index.init_app(app)
+
+# 用户社交计数
+user_stats.init_app(app)
+
+# 私聊会话摘要
+conversation_summaries.init_app(app)
+
+# 实时事件推送
+event_bus.init_app(app)
+
+# 关注关系图
+follow_graph.init_app(app)
+
+# 链上交易发件箱
+tx_outbox.init_app(app)
+
+# RPC节点配置（健康探测及新区块头订阅在首次RPC调用时启动）
+blockchain_client.init_app(app)
 
 # API根路径
 @app.route('/api', methods=['GET'])
@@ -42,7 +105,8 @@ def api_info():
             'users': '/api/users',
             'contents': '/api/contents',
             'social': '/api/follow, /api/messages',
-            'blockchain': '/api/blockchain-info'
+            'events': '/api/events/<user_id>/stream, /api/events/<user_id>/poll',
+            'blockchain': '/api/blockchain-info, /api/blockchain/endpoints, /api/tx/<tx_id>'
         },
         'blockchain': {
             'network': 'Alpha Network',
@@ -55,11 +119,8 @@ def api_info():
 @app.route('/api/blockchain-info', methods=['GET'])
 def blockchain_info():
     """获取区块链信息"""
-    from src.models.blockchain import blockchain_client
-    
     try:
-        chain_info = blockchain_client.get_chain_info()
-        block_number = blockchain_client.get_block_number()
+        chain_info, block_number = blockchain_client.get_chain_status()
         
         return jsonify({
             'success': True,
@@ -67,7 +128,9 @@ def blockchain_info():
                 'chain': chain_info.get('result', 'Alpha Network'),
                 'block_number': block_number,
                 'rpc_url': blockchain_client.config.rpc_url,
-                'ws_url': blockchain_client.config.ws_url
+                'ws_url': blockchain_client.config.ws_url,
+                'head': blockchain_client.heads.status(),
+                'account_cache': blockchain_client.accounts.stats()
             }
         })
     except Exception as e:
@@ -76,6 +139,15 @@ def blockchain_info():
             'error': str(e)
         }), 500
 
+# RPC节点状态接口
+@app.route('/api/blockchain/endpoints', methods=['GET'])
+def blockchain_endpoints():
+    """获取各RPC节点的健康状态及请求统计"""
+    return jsonify({
+        'success': True,
+        'data': blockchain_client.transport.pool.stats()
+    })
+
 # 健康检查接口
 @app.route('/api/health', methods=['GET'])
 def health_check():
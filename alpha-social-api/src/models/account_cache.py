@@ -0,0 +1,87 @@
+"""
+账户信息缓存
+按 (账户ID, 区块哈希) 缓存账户信息，新区块头到达时清空；同一账户的并发未命中合并为一次请求
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+class AccountCache:
+    """区块内账户信息缓存"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._block_hash: Optional[str] = None
+        self._entries: Dict[Tuple[str, str], Dict] = {}
+        self._inflight: Dict[Tuple[str, Optional[str]], Future] = {}
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+
+    def on_new_head(self, head: Dict):
+        """新区块头到达后清空上一区块的缓存"""
+        with self._lock:
+            if head['hash'] != self._block_hash:
+                self._block_hash = head['hash']
+                self._entries.clear()
+
+    def get_many(self, account_ids: List[str], block_hash: Optional[str],
+                 fetch: Callable[[List[str]], List[Dict]], timeout: float = None) -> Dict[str, Dict]:
+        """获取多个账户的信息，未命中的账户调用 fetch 一次取回；block_hash 为None时只合并并发请求，不缓存"""
+        results: Dict[str, Dict] = {}
+        owned: List[str] = []
+        waiting: Dict[str, Future] = {}
+
+        with self._lock:
+            for account_id in account_ids:
+                key = (account_id, block_hash)
+                if block_hash is not None and key in self._entries:
+                    results[account_id] = self._entries[key]
+                    self._hits += 1
+                elif key in self._inflight:
+                    waiting[account_id] = self._inflight[key]
+                    self._coalesced += 1
+                else:
+                    self._inflight[key] = Future()
+                    owned.append(account_id)
+                    self._misses += 1
+
+        if owned:
+            try:
+                fetched = fetch(owned)
+            except Exception as e:
+                with self._lock:
+                    futures = [self._inflight.pop((account_id, block_hash)) for account_id in owned]
+                for future in futures:
+                    future.set_exception(e)
+                raise
+
+            with self._lock:
+                futures = [self._inflight.pop((account_id, block_hash)) for account_id in owned]
+                # 只缓存成功的结果，且期间没有新区块到达
+                if block_hash is not None and block_hash == self._block_hash:
+                    for account_id, result in zip(owned, fetched):
+                        if 'result' in result and len(self._entries) < self.max_entries:
+                            self._entries[(account_id, block_hash)] = result
+            for future, result in zip(futures, fetched):
+                future.set_result(result)
+            results.update(zip(owned, fetched))
+
+        for account_id, future in waiting.items():
+            results[account_id] = future.result(timeout)
+        return results
+
+    def stats(self) -> Dict:
+        """缓存命中统计"""
+        with self._lock:
+            lookups = self._hits + self._misses + self._coalesced
+            return {
+                'block_hash': self._block_hash,
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'coalesced': self._coalesced,
+                'hit_rate': round((self._hits + self._coalesced) / lookups, 4) if lookups else 0.0
+            }
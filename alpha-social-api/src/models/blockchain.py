@@ -4,18 +4,36 @@
 """
 
 import json
-import requests
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, field
 import hashlib
 import time
 
+from src.models.rpc import AsyncRPCTransport
+from src.models.heads import HeadSubscription
+from src.models.account_cache import AccountCache
+
 @dataclass
 class BlockchainConfig:
     """区块链配置"""
     rpc_url: str = "http://127.0.0.1:9933"
+    rpc_urls: List[str] = field(default_factory=list)  # 多个RPC节点，为空时只使用 rpc_url
     ws_url: str = "ws://127.0.0.1:9944"
     chain_id: str = "alpha"
+    rpc_timeout: float = 30.0  # 单次RPC请求超时（秒）
+    max_connections: int = 10  # 连接池中的最大长连接数
+    batch_window: float = 0.002  # 并发调用合并为批量请求的等待窗口（秒），为0时不合并
+    max_batch_size: int = 50  # 单个批量请求包含的最大调用数
+    subscribe_heads: bool = True  # 通过WebSocket订阅新区块头，区块高度及链信息从内存读取
+    head_stale_after: float = 30.0  # 超过该时间（秒）未收到新区块头时视为订阅失效，改用HTTP请求
+    ws_heartbeat: float = 20.0  # WebSocket心跳间隔（秒）
+    ws_reconnect_max: float = 30.0  # 订阅断线重连的最大等待时间（秒）
+    account_cache_size: int = 10000  # 单个区块内缓存的最大账户数
+    health_check_interval: float = 5.0  # 节点健康探测间隔（秒），为0时不探测；仅配置了 rpc_urls 时探测
+    health_check_timeout: float = 2.0  # 单次健康探测超时（秒）
+    max_head_lag: int = 5  # 区块高度落后最高节点超过该值的节点被摘除
+    eject_after: int = 3  # 连续请求失败达到该次数的节点被摘除
+    readmit_after: float = 30.0  # 因请求失败被摘除的节点在该时间（秒）后允许试探请求
 
 @dataclass
 class TransactionResult:
@@ -31,48 +49,92 @@ class AlphaBlockchainClient:
     
     def __init__(self, config: BlockchainConfig = None):
         self.config = config or BlockchainConfig()
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Content-Type': 'application/json'
-        })
+        self.transport = AsyncRPCTransport(self.config)
+        self.heads = HeadSubscription(self.config, self.transport)
+        self.accounts = AccountCache(self.config.account_cache_size)
+        self.heads.add_listener(self.accounts.on_new_head)
+    
+    def init_app(self, app):
+        """配置RPC节点；节点健康探测及新区块头订阅在首次RPC调用时随事件循环启动"""
+        rpc_urls = app.config.get('BLOCKCHAIN_RPC_URLS')
+        if rpc_urls:
+            self.transport.pool.set_urls(rpc_urls)
+        self.config.subscribe_heads = app.config.get('CHAIN_HEAD_SUBSCRIPTION', self.config.subscribe_heads)
+        
+        # 只有一个默认节点时探测没有可切换的目标，不启动
+        if self.config.rpc_urls and self.config.health_check_interval > 0:
+            self.transport.on_start(self.transport.start_health_checks)
+        if self.config.subscribe_heads:
+            self.transport.on_start(self.heads.start)
     
     def _make_rpc_call(self, method: str, params: List = None) -> Dict:
         """发起RPC调用"""
-        payload = {
-            "jsonrpc": "2.0",
-            "method": method,
-            "params": params or [],
-            "id": int(time.time() * 1000)
-        }
-        
-        try:
-            response = self.session.post(self.config.rpc_url, json=payload, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            return {"error": str(e)}
+        return self.transport.call_sync(method, params)
+    
+    def _make_rpc_batch(self, calls: List[Tuple[str, List]]) -> List[Dict]:
+        """以一个批量请求发起多个RPC调用，按调用顺序返回结果"""
+        return self.transport.batch_sync(calls)
+    
+    @staticmethod
+    def _parse_block_number(result: Dict) -> int:
+        """从 chain_getHeader 的结果中解析区块高度"""
+        if "result" in result and result["result"]:
+            return int(result["result"]["number"], 16)
+        return 0
     
     def get_chain_info(self) -> Dict:
-        """获取链信息"""
+        """获取链信息，订阅正常时从内存读取"""
+        head = self.heads.latest()
+        if head and head['chain']:
+            return {"result": head['chain']}
         return self._make_rpc_call("system_chain")
     
     def get_block_number(self) -> int:
-        """获取当前区块高度"""
-        result = self._make_rpc_call("chain_getHeader")
+        """获取当前区块高度，订阅正常时从内存读取"""
+        head = self.heads.latest()
+        if head:
+            return head['number']
+        return self._parse_block_number(self._make_rpc_call("chain_getHeader"))
+    
+    def get_chain_status(self) -> Tuple[Dict, int]:
+        """获取链信息及当前区块高度，订阅失效时以一次批量请求获取"""
+        head = self.heads.latest()
+        if head and head['chain']:
+            return {"result": head['chain']}, head['number']
+        chain_info, header = self._make_rpc_batch([("system_chain", []), ("chain_getHeader", [])])
+        return chain_info, self._parse_block_number(header)
+    
+    @staticmethod
+    def _parse_balance(result: Dict) -> int:
+        """从 system_accountInfo 的结果中解析可用余额"""
         if "result" in result and result["result"]:
-            return int(result["result"]["number"], 16)
+            return int(result["result"]["data"]["free"])
         return 0
     
     def get_account_info(self, account_id: str) -> Dict:
         """获取账户信息"""
-        return self._make_rpc_call("system_accountInfo", [account_id])
+        return self.get_accounts_info([account_id])[account_id]
+    
+    def get_accounts_info(self, account_ids: List[str]) -> Dict[str, Dict]:
+        """批量获取账户信息，当前区块内已查询过的账户直接读取缓存，其余以一次批量请求获取"""
+        head = self.heads.latest()
+        return self.accounts.get_many(
+            list(dict.fromkeys(account_ids)),
+            head['hash'] if head else None,
+            lambda missing: self._make_rpc_batch([("system_accountInfo", [account_id]) for account_id in missing]),
+            timeout=self.config.rpc_timeout + 1
+        )
     
     def get_balance(self, account_id: str) -> int:
         """获取账户余额"""
-        result = self.get_account_info(account_id)
-        if "result" in result and result["result"]:
-            return int(result["result"]["data"]["free"])
-        return 0
+        return self._parse_balance(self.get_account_info(account_id))
+    
+    def get_balances(self, account_ids: List[str]) -> Dict[str, int]:
+        """批量获取账户余额"""
+        return {
+            account_id: self._parse_balance(result)
+            for account_id, result in self.get_accounts_info(account_ids).items()
+        }
     
     def create_post(self, account_id: str, content_hash: str, private_key: str = None) -> TransactionResult:
         """创建社交帖子"""
@@ -94,6 +156,27 @@ class AlphaBlockchainClient:
             }]
         )
     
+    def create_posts(self, posts: List[Dict], private_key: str = None) -> TransactionResult:
+        """批量创建社交帖子，posts 中每项包含 account_id 和 content_hash"""
+        # 这里应该将多个调用打包为一笔 utility.batch 交易并签名
+        # 为了演示，我们返回模拟结果
+        digest = "".join(f"{post['account_id']}{post['content_hash']}" for post in posts)
+        tx_hash = hashlib.sha256(f"{digest}{time.time()}".encode()).hexdigest()
+        
+        return TransactionResult(
+            success=True,
+            tx_hash=tx_hash,
+            block_hash=None,
+            events=[{
+                "event": "PostCreated",
+                "data": {
+                    "post_id": int(time.time()) + index,
+                    "author": post['account_id'],
+                    "content_hash": post['content_hash']
+                }
+            } for index, post in enumerate(posts)]
+        )
+    
     def like_post(self, account_id: str, post_id: int, private_key: str = None) -> TransactionResult:
         """点赞帖子"""
         tx_hash = hashlib.sha256(f"{account_id}{post_id}{time.time()}".encode()).hexdigest()
@@ -126,6 +209,24 @@ class AlphaBlockchainClient:
             }]
         )
     
+    def follow_users(self, follower: str, followed: List[str], private_key: str = None) -> TransactionResult:
+        """批量关注用户"""
+        # 这里应该将多个调用打包为一笔 utility.batch 交易并签名
+        # 为了演示，我们返回模拟结果
+        tx_hash = hashlib.sha256(f"{follower}{''.join(followed)}{time.time()}".encode()).hexdigest()
+        
+        return TransactionResult(
+            success=True,
+            tx_hash=tx_hash,
+            events=[{
+                "event": "UserFollowed",
+                "data": {
+                    "follower": follower,
+                    "followed": followed_id
+                }
+            } for followed_id in followed]
+        )
+    
     def send_private_message(self, sender: str, recipient: str, content_hash: str, private_key: str = None) -> TransactionResult:
         """发送私聊消息"""
         tx_hash = hashlib.sha256(f"{sender}{recipient}{content_hash}{time.time()}".encode()).hexdigest()
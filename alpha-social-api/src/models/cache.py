@@ -0,0 +1,146 @@
+"""
+内容缓存
+单条内容的读穿缓存，默认使用进程内LRU+TTL缓存，可替换为共享缓存后端
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+@dataclass
+class CacheConfig:
+    """缓存配置"""
+    max_entries: int = 10000  # 最大缓存条目数
+    ttl: float = 30.0  # 缓存有效期（秒）
+
+class CacheBackend(ABC):
+    """缓存后端接口，缓存值须可JSON序列化以便替换为共享缓存"""
+
+    name = 'base'
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存，未命中时返回None"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float = None):
+        """写入缓存"""
+
+    @abstractmethod
+    def delete(self, *keys: str):
+        """删除缓存"""
+
+    @abstractmethod
+    def clear(self):
+        """清空缓存"""
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """缓存统计"""
+
+class LocalCache(CacheBackend):
+    """进程内LRU+TTL缓存"""
+
+    name = 'local'
+
+    def __init__(self, config: CacheConfig = None):
+        self.config = config or CacheConfig()
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: float = None):
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.config.ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.config.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.name,
+                'size': len(self._entries),
+                'max_entries': self.config.max_entries,
+                'ttl': self.config.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+class ContentCache:
+    """单条内容缓存，按ID缓存序列化后的内容"""
+
+    def __init__(self, backend: CacheBackend = None):
+        self.backend = backend or LocalCache()
+
+    def init_app(self, app):
+        """按应用配置创建进程内缓存"""
+        if isinstance(self.backend, LocalCache):
+            self.backend = LocalCache(CacheConfig(
+                max_entries=app.config.get('CONTENT_CACHE_SIZE', self.backend.config.max_entries),
+                ttl=app.config.get('CONTENT_CACHE_TTL', self.backend.config.ttl)
+            ))
+
+    def set_backend(self, backend: CacheBackend):
+        """替换缓存后端"""
+        self.backend = backend
+
+    def get(self, content_id: int) -> Optional[Dict]:
+        """按ID读取内容"""
+        data = self.backend.get(f'content:id:{content_id}')
+        return dict(data) if data is not None else None
+
+    def set(self, data: Dict):
+        """写入序列化后的内容"""
+        self.backend.set(f'content:id:{data["id"]}', dict(data))
+
+    def invalidate(self, *content_ids: int):
+        """使内容缓存失效"""
+        if content_ids:
+            self.backend.delete(*(f'content:id:{content_id}' for content_id in content_ids))
+
+    def stats(self) -> Dict:
+        """缓存统计"""
+        return self.backend.stats()
+
+# 全局内容缓存实例
+content_cache = ContentCache()
@@ -3,14 +3,23 @@
 处理社交内容的存储、检索和管理
 """
 
-from flask_sqlalchemy import SQLAlchemy
+from src.models.user import db
+from sqlalchemy.dialects.sqlite import insert
+from src.models.search import search_index
+from src.models.pagination import Cursor, apply_cursor
+from src.models.trending import trending_engine
+from src.models.timeline import home_timeline
+from src.models.counters import stat_counters
+from src.models.serialization import dump_json
+from src.models.cache import content_cache
+from src.models.membership import membership_index
+from src.models.events import event_bus
+from src.models.outbox import tx_outbox
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import hashlib
 import json
 
-db = SQLAlchemy()
-
 class Content(db.Model):
     """内容模型"""
     __tablename__ = 'contents'
@@ -36,6 +45,16 @@ class Content(db.Model):
     like_count = db.Column(db.Integer, default=0)
     comment_count = db.Column(db.Integer, default=0)
     share_count = db.Column(db.Integer, default=0)
+    view_flushes = db.Column(db.Integer, default=0)  # 浏览增量写回的次数，读取方据此判断行中是否已包含某次写回
+    
+    # content_data、tags 是否以规范化格式存储，规范化的文本可直接拼接进响应
+    json_normalized = db.Column(db.Boolean, default=True)
+    
+    # 游标分页使用的复合索引
+    __table_args__ = (
+        db.Index('ix_contents_public_created_id', 'is_deleted', 'is_public', 'created_at', 'id'),
+        db.Index('ix_contents_author_created_id', 'author_id', 'created_at', 'id'),
+    )
     
     def __repr__(self):
         return f'<Content {self.id}: {self.title}>'
@@ -86,10 +105,16 @@ class Comment(db.Model):
     like_count = db.Column(db.Integer, default=0)
     reply_count = db.Column(db.Integer, default=0)
     
-    # 关系
-    content = db.relationship('Content', backref='comments')
+    # 关系（不能命名为content，否则会覆盖评论正文字段）
+    content_item = db.relationship('Content', backref='comments')
     parent = db.relationship('Comment', remote_side=[id], backref='replies')
     
+    # 游标分页及批量加载回复使用的复合索引
+    __table_args__ = (
+        db.Index('ix_comments_content_parent_created_id', 'content_id', 'parent_id', 'created_at', 'id'),
+        db.Index('ix_comments_parent_created_id', 'parent_id', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Comment {self.id} on Content {self.content_id}>'
     
@@ -157,24 +182,153 @@ class ContentManager:
     @staticmethod
     def create_content(author_id: str, content_type: str, title: str = None, 
                       description: str = None, content_data: Dict = None, 
-                      tags: List[str] = None, is_public: bool = True) -> Content:
-        """创建内容"""
-        content_data_str = json.dumps(content_data) if content_data else None
+                      tags: List[str] = None, is_public: bool = True) -> Tuple[Content, Dict]:
+        """创建内容，上链交易与内容在同一事务中写入发件箱，返回 (内容, 交易引用)"""
+        content = ContentManager._build_content(
+            author_id, content_type, title, description, content_data, tags, is_public
+        )
+        
+        db.session.add(content)
+        db.session.flush()
+        search_index.index(content)
+        home_timeline.fan_out(content)
+        stat_counters.increment('contents', 1, content.created_at.date())
+        transaction = tx_outbox.enqueue('create_post', {
+            'account_id': author_id,
+            'content_hash': content.content_hash
+        }).to_ref()
+        db.session.commit()
+        tx_outbox.notify()
+        
+        if content.is_public:
+            trending_engine.register(content.id, content.created_at)
+        return content, transaction
+    
+    @staticmethod
+    def create_contents(items: List[Dict]) -> Tuple[List[Content], Optional[Dict]]:
+        """批量创建内容，单条INSERT写入，内容哈希打包为一笔上链交易并在同一事务中提交，
+        返回 (内容列表, 交易引用)，内容对象不绑定会话（调用方负责校验参数）"""
+        now = datetime.utcnow()
+        contents = []
+        seen_hashes = set()
+        for item in items:
+            content = ContentManager._build_content(
+                author_id=item['author_id'],
+                content_type=item['content_type'],
+                title=item.get('title'),
+                description=item.get('description'),
+                content_data=item.get('content_data'),
+                tags=item.get('tags'),
+                is_public=item.get('is_public', True)
+            )
+            content.is_deleted = False
+            content.view_count = content.like_count = content.comment_count = content.share_count = 0
+            content.view_flushes = 0
+            content.created_at = content.updated_at = now
+            
+            # 同一作者的相同内容可能在同一时刻生成相同哈希
+            while content.content_hash in seen_hashes:
+                content.content_hash = Content.generate_content_hash(
+                    f"{content.content_data or ''}{len(seen_hashes)}", content.author_id
+                )
+            seen_hashes.add(content.content_hash)
+            contents.append(content)
+        if not contents:
+            return [], None
+        
+        columns = [column.name for column in Content.__table__.columns if column.name != 'id']
+        try:
+            # 内容哈希唯一，按哈希回填自增ID
+            ids = dict(
+                (content_hash, content_id) for content_id, content_hash in db.session.execute(
+                    insert(Content).returning(Content.id, Content.content_hash),
+                    [{column: getattr(content, column) for column in columns} for content in contents]
+                )
+            )
+            for content in contents:
+                content.id = ids[content.content_hash]
+            
+            search_index.index_many(contents)
+            home_timeline.fan_out_many(contents)
+            stat_counters.increment('contents', len(contents), now.date())
+            transaction = tx_outbox.enqueue('create_posts', {'posts': [
+                {'account_id': content.author_id, 'content_hash': content.content_hash}
+                for content in contents
+            ]}).to_ref()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        tx_outbox.notify()
+        
+        for content in contents:
+            if content.is_public:
+                trending_engine.register(content.id, content.created_at)
+        return contents, transaction
+    
+    @staticmethod
+    def _build_content(author_id: str, content_type: str, title: str = None,
+                       description: str = None, content_data: Dict = None,
+                       tags: List[str] = None, is_public: bool = True) -> Content:
+        """构造内容对象（不写入数据库）"""
+        content_data_str = dump_json(content_data) if content_data else None
         content_hash = Content.generate_content_hash(content_data_str or "", author_id)
         
-        content = Content(
+        return Content(
             content_hash=content_hash,
             author_id=author_id,
             content_type=content_type,
             title=title,
             description=description,
             content_data=content_data_str,
-            tags=json.dumps(tags) if tags else None,
-            is_public=is_public
+            tags=dump_json(tags) if tags else None,
+            is_public=is_public,
+            json_normalized=True
         )
+    
+    @staticmethod
+    def update_content(content_id: int, author_id: str, title: str = None,
+                      description: str = None, content_data: Dict = None,
+                      tags: List[str] = None, is_public: bool = None) -> Optional[Content]:
+        """编辑内容，未传入的字段保持不变"""
+        content = Content.query.filter_by(id=content_id, author_id=author_id, is_deleted=False).first()
+        if not content:
+            return None
+        
+        if title is not None:
+            content.title = title
+        if description is not None:
+            content.description = description
+        if not content.json_normalized:
+            # 历史数据先统一改写为规范化格式
+            content.content_data = dump_json(json.loads(content.content_data)) if content.content_data else None
+            content.tags = dump_json(json.loads(content.tags)) if content.tags else None
+            content.json_normalized = True
+        
+        if content_data is not None:
+            content.content_data = dump_json(content_data)
+        if tags is not None:
+            content.tags = dump_json(tags) if tags else None
+        was_public = content.is_public
+        if is_public is not None:
+            content.is_public = is_public
+        
+        if title is not None or description is not None:
+            search_index.index(content)
+        
+        # 转为公开时写扩散到关注者的时间线，转为私密时从时间线移除
+        if content.is_public and not was_public:
+            home_timeline.fan_out(content)
+        elif was_public and not content.is_public:
+            home_timeline.remove_content(content.id)
         
-        db.session.add(content)
         db.session.commit()
+        content_cache.invalidate(content.id)
+        
+        if is_public is True:
+            trending_engine.register(content.id, content.created_at)
+        elif is_public is False:
+            trending_engine.remove(content.id)
         return content
     
     @staticmethod
@@ -188,27 +342,61 @@ class ContentManager:
         return Content.query.filter_by(content_hash=content_hash, is_deleted=False).first()
     
     @staticmethod
-    def get_user_contents(author_id: str, limit: int = 20, offset: int = 0) -> List[Content]:
-        """获取用户的内容"""
-        return Content.query.filter_by(
+    def get_content_data(content_id: int) -> Tuple[Optional[Dict], int]:
+        """获取序列化后的内容及其浏览写回次数，优先读取缓存"""
+        data = content_cache.get(content_id)
+        if data is None:
+            content = ContentManager.get_content(content_id)
+            if not content:
+                return None, 0
+            data = dict(content.to_dict(), _view_flushes=content.view_flushes or 0)
+            content_cache.set(data)
+        return data, data.pop('_view_flushes', 0)
+    
+    @staticmethod
+    def get_user_contents(author_id: str, limit: int = 20, offset: int = 0,
+                          cursor: Cursor = None) -> List[Content]:
+        """获取用户的内容，传入游标时忽略offset"""
+        query = Content.query.filter_by(
             author_id=author_id, 
             is_deleted=False, 
             is_public=True
-        ).order_by(Content.created_at.desc()).offset(offset).limit(limit).all()
+        )
+        query = apply_cursor(query, Content.created_at, Content.id, cursor)
+        
+        if not cursor:
+            query = query.offset(offset)
+        return query.limit(limit).all()
     
     @staticmethod
-    def get_public_contents(limit: int = 20, offset: int = 0, content_type: str = None) -> List[Content]:
-        """获取公开内容"""
+    def get_public_contents(limit: int = 20, offset: int = 0, content_type: str = None,
+                            cursor: Cursor = None) -> List[Content]:
+        """获取公开内容，传入游标时忽略offset"""
         query = Content.query.filter_by(is_deleted=False, is_public=True)
         
         if content_type:
             query = query.filter_by(content_type=content_type)
         
-        return query.order_by(Content.created_at.desc()).offset(offset).limit(limit).all()
+        query = apply_cursor(query, Content.created_at, Content.id, cursor)
+        
+        if not cursor:
+            query = query.offset(offset)
+        return query.limit(limit).all()
     
     @staticmethod
     def search_contents(keyword: str, limit: int = 20, offset: int = 0) -> List[Content]:
         """搜索内容"""
+        if search_index.enabled:
+            content_ids = search_index.search(keyword, limit, offset)
+            if not content_ids:
+                return []
+            contents = {
+                content.id: content
+                for content in Content.query.filter(Content.id.in_(content_ids)).all()
+            }
+            # 保持相关度顺序
+            return [contents[content_id] for content_id in content_ids if content_id in contents]
+        
         return Content.query.filter(
             Content.is_deleted == False,
             Content.is_public == True,
@@ -219,28 +407,38 @@ class ContentManager:
         ).order_by(Content.created_at.desc()).offset(offset).limit(limit).all()
     
     @staticmethod
-    def update_content_stats(content_id: int, stat_type: str, increment: int = 1):
-        """更新内容统计"""
-        content = Content.query.get(content_id)
-        if content:
-            if stat_type == 'view':
-                content.view_count += increment
-            elif stat_type == 'like':
-                content.like_count += increment
-            elif stat_type == 'comment':
-                content.comment_count += increment
-            elif stat_type == 'share':
-                content.share_count += increment
-            
+    def update_content_stats(content_id: int, stat_type: str, increment: int = 1, commit: bool = True):
+        """更新内容统计，在数据库端累加以免并发更新丢失；commit=False 时由调用方提交事务"""
+        column = {
+            'view': Content.view_count,
+            'like': Content.like_count,
+            'comment': Content.comment_count,
+            'share': Content.share_count
+        }.get(stat_type)
+        if column is None:
+            return
+        
+        Content.query.filter_by(id=content_id).update(
+            {column: db.func.coalesce(column, 0) + increment},
+            synchronize_session='fetch'
+        )
+        
+        if commit:
             db.session.commit()
+            content_cache.invalidate(content_id)
     
     @staticmethod
     def delete_content(content_id: int, author_id: str) -> bool:
-        """删除内容（软删除）"""
-        content = Content.query.filter_by(id=content_id, author_id=author_id).first()
+        """删除内容（软删除），已删除的内容返回False，不重复调整计数和索引"""
+        content = Content.query.filter_by(id=content_id, author_id=author_id, is_deleted=False).first()
         if content:
             content.is_deleted = True
+            search_index.remove(content.id)
+            home_timeline.remove_content(content.id)
+            stat_counters.increment('contents', -1, content.created_at.date())
             db.session.commit()
+            content_cache.invalidate(content.id)
+            trending_engine.remove(content.id)
             return True
         return False
     
@@ -257,25 +455,44 @@ class ContentManager:
         db.session.add(comment)
         
         # 更新内容的评论数
-        ContentManager.update_content_stats(content_id, 'comment')
+        ContentManager.update_content_stats(content_id, 'comment', commit=False)
         
         # 如果是回复，更新父评论的回复数
+        parent_comment = None
         if parent_id:
             parent_comment = Comment.query.get(parent_id)
             if parent_comment:
                 parent_comment.reply_count += 1
         
+        stat_counters.increment('comments')
         db.session.commit()
+        content_cache.invalidate(content_id)
+        trending_engine.record(content_id, 'comment')
+        
+        if event_bus.active:
+            # 通知内容作者及被回复的评论作者
+            recipients = {ContentManager._target_author('content', content_id)}
+            if parent_comment:
+                recipients.add(parent_comment.author_id)
+            recipients.discard(None)
+            recipients.discard(author_id)
+            event_bus.publish(recipients, 'comment', comment.to_dict())
         return comment
     
     @staticmethod
-    def get_comments(content_id: int, limit: int = 20, offset: int = 0) -> List[Comment]:
-        """获取评论列表"""
-        return Comment.query.filter_by(
+    def get_comments(content_id: int, limit: int = 20, offset: int = 0,
+                     cursor: Cursor = None) -> List[Comment]:
+        """获取评论列表，传入游标时忽略offset"""
+        query = Comment.query.filter_by(
             content_id=content_id, 
             is_deleted=False,
             parent_id=None  # 只获取顶级评论
-        ).order_by(Comment.created_at.desc()).offset(offset).limit(limit).all()
+        )
+        query = apply_cursor(query, Comment.created_at, Comment.id, cursor)
+        
+        if not cursor:
+            query = query.offset(offset)
+        return query.limit(limit).all()
     
     @staticmethod
     def get_comment_replies(comment_id: int, limit: int = 10) -> List[Comment]:
@@ -286,46 +503,131 @@ class ContentManager:
         ).order_by(Comment.created_at.asc()).limit(limit).all()
     
     @staticmethod
-    def toggle_like(user_id: str, target_type: str, target_id: int) -> bool:
-        """切换点赞状态"""
-        like = Like.query.filter_by(
-            user_id=user_id,
-            target_type=target_type,
-            target_id=target_id
+    def get_comment_replies_bulk(comment_ids: List[int], limit: int = 10) -> Dict[int, List[Comment]]:
+        """批量获取多条评论各自的前N条回复，只发起一次查询"""
+        if not comment_ids:
+            return {}
+        
+        # 按父评论分区编号，每个分区只保留最早的N条回复
+        row_number = db.func.row_number().over(
+            partition_by=Comment.parent_id,
+            order_by=(Comment.created_at.asc(), Comment.id.asc())
+        ).label('row_number')
+        ranked = db.session.query(Comment.id.label('id'), row_number).filter(
+            Comment.parent_id.in_(comment_ids),
+            Comment.is_deleted == False
+        ).subquery()
+        
+        replies = Comment.query.join(ranked, Comment.id == ranked.c.id).filter(
+            ranked.c.row_number <= limit
+        ).order_by(Comment.parent_id, Comment.created_at.asc(), Comment.id.asc()).all()
+        
+        replies_by_comment = {comment_id: [] for comment_id in comment_ids}
+        for reply in replies:
+            replies_by_comment[reply.parent_id].append(reply)
+        return replies_by_comment
+    
+    @staticmethod
+    def toggle_like(user_id: str, target_type: str, target_id: int) -> Tuple[bool, Optional[Dict]]:
+        """切换点赞状态，点赞记录、点赞数及内容点赞的上链交易在同一事务中原子写入，
+        返回 (是否点赞, 交易引用)，没有新的上链交易时交易引用为None"""
+        likes = Like.__table__
+        
+        # 先尝试删除已有点赞，删除成功即为取消点赞，否则插入新点赞
+        removed = db.session.execute(
+            likes.delete().where(
+                likes.c.user_id == user_id,
+                likes.c.target_type == target_type,
+                likes.c.target_id == target_id
+            ).returning(likes.c.id)
         ).first()
         
-        if like:
-            # 取消点赞
-            db.session.delete(like)
-            if target_type == 'content':
-                ContentManager.update_content_stats(target_id, 'like', -1)
-            elif target_type == 'comment':
-                comment = Comment.query.get(target_id)
-                if comment:
-                    comment.like_count -= 1
-            db.session.commit()
-            return False
+        if removed:
+            delta = -1
         else:
-            # 添加点赞
-            like = Like(user_id=user_id, target_type=target_type, target_id=target_id)
-            db.session.add(like)
-            if target_type == 'content':
-                ContentManager.update_content_stats(target_id, 'like', 1)
-            elif target_type == 'comment':
-                comment = Comment.query.get(target_id)
-                if comment:
-                    comment.like_count += 1
-            db.session.commit()
-            return True
+            added = db.session.execute(
+                insert(Like).values(
+                    user_id=user_id,
+                    target_type=target_type,
+                    target_id=target_id,
+                    created_at=datetime.utcnow()
+                ).on_conflict_do_nothing().returning(Like.id)
+            ).first()
+            if not added:
+                # 并发请求已插入相同的点赞
+                db.session.rollback()
+                return True, None
+            delta = 1
+        
+        if target_type == 'content':
+            ContentManager.update_content_stats(target_id, 'like', delta, commit=False)
+        elif target_type == 'comment':
+            Comment.query.filter_by(id=target_id).update(
+                {Comment.like_count: db.func.coalesce(Comment.like_count, 0) + delta},
+                synchronize_session='fetch'
+            )
+        stat_counters.increment('likes', delta)
+        transaction = None
+        if target_type == 'content' and delta > 0:
+            transaction = tx_outbox.enqueue('like_post', {'account_id': user_id, 'post_id': target_id}).to_ref()
+        db.session.commit()
+        if transaction:
+            tx_outbox.notify()
+        membership_index.on_like(user_id, target_type, target_id, delta > 0)
+        
+        if target_type == 'content':
+            content_cache.invalidate(target_id)
+            trending_engine.record(target_id, 'like', delta)
+        
+        if event_bus.active:
+            target_author = ContentManager._target_author(target_type, target_id)
+            if target_author and target_author != user_id:
+                event_bus.publish([target_author], 'like', {
+                    'user_id': user_id,
+                    'target_type': target_type,
+                    'target_id': target_id,
+                    'liked': delta > 0
+                })
+        return delta > 0, transaction
+    
+    @staticmethod
+    def _target_author(target_type: str, target_id: int) -> Optional[str]:
+        """获取点赞、评论目标的作者"""
+        model = Content if target_type == 'content' else Comment
+        row = db.session.query(model.author_id).filter(model.id == target_id).first()
+        return row[0] if row else None
     
     @staticmethod
     def is_liked(user_id: str, target_type: str, target_id: int) -> bool:
-        """检查是否已点赞"""
-        return Like.query.filter_by(
+        """检查是否已点赞，索引确定未点赞时不查询数据库"""
+        if membership_index.is_liked(user_id, target_type, target_id) is False:
+            return False
+        is_liked = Like.query.filter_by(
             user_id=user_id,
             target_type=target_type,
             target_id=target_id
         ).first() is not None
+        if not is_liked:
+            membership_index.discard_likes(user_id, target_type, [target_id])
+        return is_liked
+    
+    @staticmethod
+    def get_liked_ids(user_id: str, target_type: str, target_ids: List[int]) -> set:
+        """批量检查点赞状态，返回已点赞的目标ID集合；只有索引命中或无法确定的ID以一次查询确认"""
+        if not target_ids:
+            return set()
+        candidates, unresolved = membership_index.liked_ids(user_id, target_type, target_ids)
+        if not candidates and not unresolved:
+            return set()
+        
+        rows = db.session.query(Like.target_id).filter(
+            Like.user_id == user_id,
+            Like.target_type == target_type,
+            Like.target_id.in_(candidates | unresolved)
+        ).all()
+        liked_ids = {row[0] for row in rows}
+        membership_index.discard_likes(user_id, target_type, candidates - liked_ids)
+        return liked_ids
     
     @staticmethod
     def add_share(user_id: str, content_id: int, platform: str = None, share_text: str = None) -> Share:
@@ -338,7 +640,10 @@ class ContentManager:
         )
         
         db.session.add(share)
-        ContentManager.update_content_stats(content_id, 'share')
+        ContentManager.update_content_stats(content_id, 'share', commit=False)
+        stat_counters.increment('shares')
         db.session.commit()
+        content_cache.invalidate(content_id)
+        trending_engine.record(content_id, 'share')
         return share
 
@@ -0,0 +1,173 @@
+"""
+私聊会话摘要
+每个用户与每个对话伙伴一行，记录最后一条可见消息及未读数，随私信写操作同步更新
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import click
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+
+from src.models.user import db
+from src.models.social import PrivateMessage, backfill_conversation_keys
+from src.models.pagination import Cursor, apply_cursor, encode_cursor
+
+class Conversation(db.Model):
+    """会话摘要模型"""
+    __tablename__ = 'conversations'
+
+    user_id = db.Column(db.String(64), primary_key=True)
+    partner_id = db.Column(db.String(64), primary_key=True)
+    last_message_id = db.Column(db.Integer, nullable=False)
+    last_message_at = db.Column(db.DateTime, nullable=False)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_conversations_user_last', 'user_id', 'last_message_at', 'last_message_id'),
+    )
+
+class ConversationSummaries:
+    """会话摘要存储"""
+
+    def init_app(self, app):
+        """补写历史消息的会话键，首次启动时按已有消息生成摘要，并注册重建命令"""
+        with app.app_context():
+            backfill_conversation_keys()
+            if not Conversation.query.first() and PrivateMessage.query.first():
+                self.rebuild()
+
+        @app.cli.command('conversations-rebuild')
+        def conversations_rebuild():
+            """按私信数据重建会话摘要"""
+            count = self.rebuild()
+            click.echo(f'Rebuilt {count} conversation summaries')
+
+    def on_message_sent(self, message):
+        """新消息写入双方的会话摘要，接收方未读数加一（不提交事务）"""
+        db.session.flush()
+
+        statement = insert(Conversation)
+        db.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=['user_id', 'partner_id'],
+                set_={
+                    'last_message_id': statement.excluded.last_message_id,
+                    'last_message_at': statement.excluded.last_message_at,
+                    'unread_count': Conversation.unread_count + statement.excluded.unread_count
+                }
+            ),
+            [
+                {
+                    'user_id': message.sender_id,
+                    'partner_id': message.recipient_id,
+                    'last_message_id': message.id,
+                    'last_message_at': message.created_at,
+                    'unread_count': 0
+                },
+                {
+                    'user_id': message.recipient_id,
+                    'partner_id': message.sender_id,
+                    'last_message_id': message.id,
+                    'last_message_at': message.created_at,
+                    'unread_count': 1
+                }
+            ]
+        )
+
+    def on_message_read(self, user_id: str, partner_id: str, count: int = 1):
+        """未读消息被标记已读（不提交事务）"""
+        if count:
+            Conversation.query.filter_by(user_id=user_id, partner_id=partner_id).update(
+                {Conversation.unread_count: Conversation.unread_count - count},
+                synchronize_session=False
+            )
+
+    def on_message_deleted(self, user_id: str, partner_id: str, message_id: int, was_unread: bool = False):
+        """用户删除消息后，更新其未读数，删除的是最后一条消息时重新定位（不提交事务）"""
+        if was_unread:
+            self.on_message_read(user_id, partner_id)
+
+        summary = db.session.get(Conversation, (user_id, partner_id))
+        if summary is not None and summary.last_message_id == message_id:
+            self.refresh(user_id, partner_id)
+
+    def refresh(self, user_id: str, partner_id: str):
+        """重新定位用户在该会话中最后一条可见消息，没有可见消息时移除会话（不提交事务）"""
+        latest = self._latest_visible(user_id, partner_id)
+        query = Conversation.query.filter_by(user_id=user_id, partner_id=partner_id)
+        if latest is None:
+            query.delete(synchronize_session='fetch')
+        else:
+            query.update(
+                {Conversation.last_message_id: latest[1], Conversation.last_message_at: latest[0]},
+                synchronize_session='fetch'
+            )
+
+    def _latest_visible(self, user_id: str, partner_id: str) -> Optional[Tuple]:
+        """按收发两个方向分别查最新的可见消息，返回 (created_at, id)"""
+        candidates = [
+            PrivateMessage.query.with_entities(PrivateMessage.created_at, PrivateMessage.id).filter(
+                PrivateMessage.sender_id == sender_id,
+                PrivateMessage.recipient_id == recipient_id,
+                deleted_flag == False
+            ).order_by(PrivateMessage.created_at.desc(), PrivateMessage.id.desc()).first()
+            for sender_id, recipient_id, deleted_flag in (
+                (user_id, partner_id, PrivateMessage.is_deleted_by_sender),
+                (partner_id, user_id, PrivateMessage.is_deleted_by_recipient)
+            )
+        ]
+        candidates = [tuple(row) for row in candidates if row is not None]
+        return max(candidates) if candidates else None
+
+    def list(self, user_id: str, limit: int = 20, offset: int = 0,
+             cursor: Cursor = None) -> Tuple[List[Dict], Optional[str]]:
+        """按最后消息时间倒序获取用户的会话列表，返回会话及下一页游标"""
+        query = apply_cursor(
+            Conversation.query.filter_by(user_id=user_id),
+            Conversation.last_message_at, Conversation.last_message_id, cursor
+        )
+        if not cursor:
+            query = query.offset(offset)
+        summaries = query.limit(limit).all()
+
+        message_ids = [summary.last_message_id for summary in summaries]
+        messages = {
+            message.id: message
+            for message in PrivateMessage.query.filter(PrivateMessage.id.in_(message_ids)).all()
+        } if message_ids else {}
+
+        cursor_token = None
+        if len(summaries) == limit:
+            cursor_token = encode_cursor(summaries[-1].last_message_at, summaries[-1].last_message_id)
+
+        return [
+            {
+                'partner_id': summary.partner_id,
+                'last_message': messages[summary.last_message_id].to_dict(),
+                'unread_count': summary.unread_count
+            }
+            for summary in summaries if summary.last_message_id in messages
+        ], cursor_token
+
+    def rebuild(self) -> int:
+        """按私信数据重新生成全部会话摘要"""
+        Conversation.query.delete()
+        db.session.execute(text(
+            "INSERT INTO conversations (user_id, partner_id, last_message_id, last_message_at, unread_count) "
+            "SELECT owner_id, partner_id, id, created_at, unread_count FROM ("
+            "SELECT owner_id, partner_id, id, created_at, "
+            "ROW_NUMBER() OVER (PARTITION BY owner_id, partner_id ORDER BY created_at DESC, id DESC) AS row_number, "
+            "SUM(unread) OVER (PARTITION BY owner_id, partner_id) AS unread_count FROM ("
+            "SELECT sender_id AS owner_id, recipient_id AS partner_id, id, created_at, 0 AS unread "
+            "FROM private_messages WHERE is_deleted_by_sender = 0 "
+            "UNION ALL "
+            "SELECT recipient_id, sender_id, id, created_at, CASE WHEN is_read THEN 0 ELSE 1 END "
+            "FROM private_messages WHERE is_deleted_by_recipient = 0"
+            ")) WHERE row_number = 1"
+        ))
+        db.session.commit()
+        return Conversation.query.count()
+
+# 全局会话摘要实例
+conversation_summaries = ConversationSummaries()
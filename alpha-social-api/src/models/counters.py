@@ -0,0 +1,168 @@
+"""
+全局统计计数器
+内容、评论、点赞、分享总数及每日新增内容数，随写操作增量更新并定期校正
+"""
+
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict
+
+import click
+from sqlalchemy.dialects.sqlite import insert
+
+from src.models.user import db
+
+@dataclass
+class CounterConfig:
+    """统计计数器配置"""
+    reconcile_interval: float = 3600.0  # 定期按实际数据校正计数的间隔（秒）
+
+class StatCounter(db.Model):
+    """统计计数模型"""
+    __tablename__ = 'stat_counters'
+
+    name = db.Column(db.String(32), primary_key=True)
+    bucket = db.Column(db.String(10), primary_key=True, default='')  # 空字符串为总数，否则为日期
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class StatCounters:
+    """统计计数器"""
+
+    names = ('contents', 'comments', 'likes', 'shares')
+
+    def __init__(self, config: CounterConfig = None):
+        self.config = config or CounterConfig()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._app = None
+
+    def init_app(self, app):
+        """首次启动时按实际数据初始化计数，并启动定期校正线程"""
+        self._app = app
+        self.config.reconcile_interval = app.config.get('STATS_RECONCILE_INTERVAL', self.config.reconcile_interval)
+
+        with app.app_context():
+            if not StatCounter.query.first():
+                self.reconcile()
+
+        @app.cli.command('stats-reconcile')
+        def stats_reconcile():
+            """按实际数据校正统计计数"""
+            self.reconcile()
+            click.echo('Stat counters reconciled')
+
+        self._thread = threading.Thread(target=self._run, name='stats-reconcile', daemon=True)
+        self._thread.start()
+
+    def increment(self, name: str, delta: int = 1, day: date = None):
+        """增量更新计数，传入日期时同时更新当日分桶（不提交事务）"""
+        rows = [{'name': name, 'bucket': '', 'value': delta}]
+        if day is not None:
+            rows.append({'name': name, 'bucket': day.isoformat(), 'value': delta})
+
+        statement = insert(StatCounter)
+        db.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=['name', 'bucket'],
+                set_={'value': StatCounter.value + statement.excluded.value}
+            ),
+            rows
+        )
+
+    def snapshot(self, day: date = None) -> Dict[str, int]:
+        """获取各项总数及指定日期（默认今天）的新增内容数"""
+        day = day or datetime.utcnow().date()
+        rows = StatCounter.query.filter(
+            db.or_(
+                StatCounter.bucket == '',
+                db.and_(StatCounter.name == 'contents', StatCounter.bucket == day.isoformat())
+            )
+        ).all()
+
+        totals = {name: 0 for name in self.names}
+        today_contents = 0
+        for row in rows:
+            if row.bucket:
+                today_contents = row.value
+            else:
+                totals[row.name] = row.value
+
+        return {
+            'total_contents': totals['contents'],
+            'total_comments': totals['comments'],
+            'total_likes': totals['likes'],
+            'total_shares': totals['shares'],
+            'today_contents': today_contents
+        }
+
+    def reconcile(self):
+        """按实际数据校正全部计数
+
+        以单条只读查询在同一快照中统计实际数量并读取当时的计数，再以一次增量写入补上差值，
+        计数期间不持有写锁，统计之后提交的并发增量也不会被覆盖。
+        """
+        from src.models.content import Content, Comment, Like, Share
+
+        counters = StatCounter.__table__
+
+        def counter_value(name, bucket):
+            return db.select(counters.c.value).where(
+                counters.c.name == name, counters.c.bucket == bucket
+            ).scalar_subquery()
+
+        def total(name, model, *criteria):
+            actual = db.select(db.func.count()).select_from(model).where(*criteria).scalar_subquery()
+            return db.select(db.literal(name), db.literal(''), actual, counter_value(name, ''))
+
+        day = db.func.date(Content.created_at)
+        daily = db.select(day.label('bucket'), db.func.count(Content.id).label('value')).where(
+            Content.is_deleted == False, Content.created_at != None
+        ).group_by(day).cte('daily')
+
+        rows = db.session.execute(db.union_all(
+            total('contents', Content, Content.is_deleted == False),
+            total('comments', Comment, Comment.is_deleted == False),
+            total('likes', Like),
+            total('shares', Share),
+            db.select(db.literal('contents'), daily.c.bucket, daily.c.value, counter_value('contents', daily.c.bucket)),
+            # 已没有内容的日期分桶归零
+            db.select(counters.c.name, counters.c.bucket, db.literal(0), counters.c.value).where(
+                counters.c.name == 'contents',
+                counters.c.bucket != '',
+                counters.c.bucket.notin_(db.select(daily.c.bucket))
+            )
+        )).all()
+        db.session.rollback()
+
+        corrections = [
+            {'name': name, 'bucket': bucket, 'value': actual - (seen or 0)}
+            for name, bucket, actual, seen in rows
+            if seen is None or actual != seen
+        ]
+        if corrections:
+            statement = insert(StatCounter)
+            db.session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=['name', 'bucket'],
+                    set_={'value': StatCounter.value + statement.excluded.value}
+                ),
+                corrections
+            )
+        db.session.commit()
+
+    def shutdown(self):
+        """停止定期校正线程"""
+        self._stopped.set()
+
+    def _run(self):
+        """定期校正循环"""
+        while not self._stopped.wait(self.config.reconcile_interval):
+            try:
+                with self._app.app_context():
+                    self.reconcile()
+            except Exception as e:
+                self._app.logger.warning(f"Stat counter reconcile failed: {e}")
+
+# 全局统计计数器实例
+stat_counters = StatCounters()
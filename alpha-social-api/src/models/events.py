@@ -0,0 +1,180 @@
+"""
+实时事件总线
+进程内发布订阅，向在线用户推送新私信、已读回执、点赞、评论和关注事件
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+@dataclass
+class EventBusConfig:
+    """事件总线配置"""
+    max_connections: int = 1000  # 同时在线的流式和长轮询连接上限
+    queue_size: int = 100  # 每个连接缓冲的未发送事件上限，超出时丢弃最早的事件并通知客户端重新同步
+    history_size: int = 100  # 每个用户保留的近期事件数，用于断线重连和长轮询续读
+    history_ttl: float = 120.0  # 用户所有连接断开后近期事件的保留时间（秒）
+    heartbeat_interval: float = 15.0  # 流式连接的心跳间隔（秒）
+    long_poll_timeout: float = 25.0  # 长轮询最长等待时间（秒）
+
+class TooManyConnections(Exception):
+    """连接数已达上限"""
+
+class _Channel:
+    """单个用户的事件通道"""
+
+    def __init__(self, history_size: int):
+        self.history = deque(maxlen=history_size)
+        self.subscriptions: Set['Subscription'] = set()
+        self.idle_since: Optional[float] = None
+
+class Subscription:
+    """单个连接的事件队列"""
+
+    def __init__(self, bus: 'EventBus', user_id: str, queue_size: int):
+        self.bus = bus
+        self.user_id = user_id
+        self.queue = deque()
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.closed = False
+        self._condition = threading.Condition(bus._lock)
+
+    def _push(self, event: Dict):
+        """写入事件，队列已满时丢弃最早的事件（调用方持有总线锁）"""
+        if len(self.queue) >= self.queue_size:
+            self.queue.popleft()
+            self.dropped += 1
+        self.queue.append(event)
+        self._condition.notify()
+
+    def get(self, timeout: float) -> List[Dict]:
+        """取出全部待发送事件，无事件时最多等待 timeout 秒；有事件被丢弃时先返回重新同步事件"""
+        with self._condition:
+            if not self.queue and not self.closed:
+                self._condition.wait(timeout)
+
+            events = []
+            if self.dropped:
+                events.append({'id': None, 'type': 'resync', 'data': {'dropped': self.dropped}})
+                self.dropped = 0
+            events.extend(self.queue)
+            self.queue.clear()
+            return events
+
+    def close(self):
+        """断开连接"""
+        self.bus._unsubscribe(self)
+
+class EventBus:
+    """进程内事件总线"""
+
+    def __init__(self, config: EventBusConfig = None):
+        self.config = config or EventBusConfig()
+        self._lock = threading.Lock()
+        self._channels: Dict[str, _Channel] = {}
+        self._connections = 0
+        self._ids = itertools.count(1)
+        self._published = 0
+
+    def init_app(self, app):
+        """读取连接上限及队列配置"""
+        self.config.max_connections = app.config.get('EVENT_STREAM_MAX_CONNECTIONS', self.config.max_connections)
+        self.config.queue_size = app.config.get('EVENT_STREAM_QUEUE_SIZE', self.config.queue_size)
+
+    @property
+    def active(self) -> bool:
+        """是否有用户在线或保留着近期事件"""
+        return bool(self._channels)
+
+    def publish(self, user_ids: Iterable[str], event_type: str, data: Dict):
+        """向指定用户发布事件，没有在线连接或近期事件的用户直接跳过"""
+        if not self._channels:
+            return
+
+        event = {
+            'id': None,
+            'type': event_type,
+            'data': data,
+            'created_at': datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            for user_id in set(user_ids):
+                channel = self._channels.get(user_id)
+                if channel is None:
+                    continue
+                if event['id'] is None:
+                    event['id'] = next(self._ids)
+                    self._published += 1
+                channel.history.append(event)
+                for subscription in channel.subscriptions:
+                    subscription._push(event)
+
+    def subscribe(self, user_id: str, last_event_id: int = None) -> Subscription:
+        """建立连接，传入 last_event_id 时补发通道中保留的后续事件"""
+        with self._lock:
+            self._expire_idle()
+            if self._connections >= self.config.max_connections:
+                raise TooManyConnections(f'Connection limit reached ({self.config.max_connections})')
+
+            channel = self._channels.get(user_id)
+            if channel is None:
+                channel = self._channels[user_id] = _Channel(self.config.history_size)
+            channel.idle_since = None
+
+            subscription = Subscription(self, user_id, self.config.queue_size)
+            channel.subscriptions.add(subscription)
+            self._connections += 1
+
+            if last_event_id is not None:
+                for event in channel.history:
+                    if event['id'] > last_event_id:
+                        subscription._push(event)
+            return subscription
+
+    def last_event_id(self, user_id: str) -> Optional[int]:
+        """用户通道中最新事件的ID"""
+        with self._lock:
+            channel = self._channels.get(user_id)
+            return channel.history[-1]['id'] if channel and channel.history else None
+
+    def _unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            subscription._condition.notify()
+            self._connections -= 1
+
+            channel = self._channels.get(subscription.user_id)
+            if channel is not None:
+                channel.subscriptions.discard(subscription)
+                if not channel.subscriptions:
+                    channel.idle_since = time.monotonic()
+
+    def _expire_idle(self):
+        """移除连接全部断开且超过保留时间的通道（调用方持有总线锁）"""
+        deadline = time.monotonic() - self.config.history_ttl
+        expired = [
+            user_id for user_id, channel in self._channels.items()
+            if channel.idle_since is not None and channel.idle_since < deadline
+        ]
+        for user_id in expired:
+            del self._channels[user_id]
+
+    def stats(self) -> Dict:
+        """连接及事件统计"""
+        with self._lock:
+            return {
+                'connections': self._connections,
+                'max_connections': self.config.max_connections,
+                'channels': len(self._channels),
+                'published': self._published
+            }
+
+# 全局事件总线实例
+event_bus = EventBus()
@@ -0,0 +1,288 @@
+"""
+关注关系图
+将关注关系以CSR数组常驻内存，用户ID映射为整数；关注、取消关注以增量方式记录，累积到一定数量后合并；
+后台定期从数据库重建，纠正其他进程写入造成的偏差
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from src.models.user import db
+
+@dataclass
+class FollowGraphConfig:
+    """关注关系图配置"""
+    enabled: bool = True  # 关闭时推荐用户、互相关注直接查询数据库
+    compact_threshold: int = 10000  # 增量边数达到该值时合并进CSR数组
+    load_batch: int = 50000  # 从数据库载入时每批读取的记录数
+    resync_interval: float = 600.0  # 从数据库重建的间隔（秒），为0时只在启动时载入
+
+class _Adjacency:
+    """单方向的邻接表：CSR数组加增删增量"""
+
+    def __init__(self):
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.added: Dict[int, Set[int]] = {}
+        self.removed: Dict[int, Set[int]] = {}
+        self.delta_count = 0
+
+    @classmethod
+    def from_edges(cls, sources: np.ndarray, targets: np.ndarray, size: int) -> '_Adjacency':
+        """由边数组构建，每行的邻居按ID升序排列"""
+        adjacency = cls()
+        order = np.lexsort((targets, sources))
+        adjacency.indices = targets[order].astype(np.int32)
+        counts = np.bincount(sources, minlength=size)
+        adjacency.indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return adjacency
+
+    def _base(self, node: int) -> np.ndarray:
+        if node + 1 >= len(self.indptr):
+            return self.indices[:0]
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def neighbors(self, node: int) -> np.ndarray:
+        """合并增量后的邻居，按ID升序"""
+        base = self._base(node)
+        removed = self.removed.get(node)
+        added = self.added.get(node)
+        if removed:
+            base = base[~np.isin(base, np.fromiter(removed, dtype=np.int32))]
+        if added:
+            base = np.union1d(base, np.fromiter(added, dtype=np.int32)).astype(np.int32)
+        return base
+
+    def gather(self, nodes: np.ndarray) -> np.ndarray:
+        """一次取出多个节点的全部邻居（可重复），无增量的节点直接按CSR切片向量化拼接"""
+        has_delta = np.fromiter(
+            (node in self.added or node in self.removed for node in nodes.tolist()),
+            dtype=bool, count=len(nodes)
+        )
+        plain = nodes[~has_delta]
+        plain = plain[plain + 1 < len(self.indptr)]
+
+        starts = self.indptr[plain]
+        lengths = self.indptr[plain + 1] - starts
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        parts = [self.indices[offsets + np.arange(lengths.sum())]]
+        parts.extend(self.neighbors(node) for node in nodes[has_delta].tolist())
+        return np.concatenate(parts) if parts else self.indices[:0]
+
+    def add(self, source: int, target: int):
+        if target in self.removed.get(source, ()):
+            self.removed[source].discard(target)
+        elif not np.any(self._base(source) == target):
+            self.added.setdefault(source, set()).add(target)
+        self.delta_count += 1
+
+    def remove(self, source: int, target: int):
+        if target in self.added.get(source, ()):
+            self.added[source].discard(target)
+        elif np.any(self._base(source) == target):
+            self.removed.setdefault(source, set()).add(target)
+        self.delta_count += 1
+
+    def edges(self, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """合并增量后的全部边"""
+        sources = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int32), np.diff(self.indptr))
+        targets = self.indices
+        if self.removed:
+            drop = np.zeros(len(targets), dtype=bool)
+            for source, removed in self.removed.items():
+                start, end = self.indptr[source], self.indptr[source + 1]
+                drop[start:end] = np.isin(targets[start:end], np.fromiter(removed, dtype=np.int32))
+            sources, targets = sources[~drop], targets[~drop]
+        extra = [(source, target) for source, added in self.added.items() for target in added]
+        if extra:
+            extra = np.array(extra, dtype=np.int32)
+            sources = np.concatenate((sources, extra[:, 0]))
+            targets = np.concatenate((targets, extra[:, 1]))
+        return sources, targets
+
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes
+
+class FollowGraph:
+    """关注关系图"""
+
+    algorithm = 'friends_of_friends_ranked'
+
+    def __init__(self, config: FollowGraphConfig = None):
+        self.config = config or FollowGraphConfig()
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._following = _Adjacency()
+        self._followers = _Adjacency()
+        self._ready = False
+        self._replay: Optional[List[Tuple[bool, str, str]]] = None
+        self._stopped = threading.Event()
+        self._thread = None
+        self._app = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready
+
+    def init_app(self, app):
+        """启动时从数据库载入关注关系，并启动后台定期重建线程"""
+        self._app = app
+        self.config.enabled = app.config.get('FOLLOW_GRAPH_ENABLED', self.config.enabled)
+        self.config.resync_interval = app.config.get('FOLLOW_GRAPH_RESYNC_INTERVAL', self.config.resync_interval)
+        if not self.config.enabled:
+            return
+
+        with app.app_context():
+            self.rebuild()
+
+        if self.config.resync_interval > 0:
+            self._thread = threading.Thread(target=self._run, name='follow-graph-resync', daemon=True)
+            self._thread.start()
+
+    def rebuild(self):
+        """从数据库重新载入全部关注关系，载入期间的关注、取消关注在替换后重放"""
+        from src.models.social import Follow
+
+        with self._lock:
+            if self._ready:
+                self._replay = []
+
+        ids: Dict[str, int] = {}
+        names: List[str] = []
+        sources: List[int] = []
+        targets: List[int] = []
+        for follower_id, followed_id in db.session.query(
+            Follow.follower_id, Follow.followed_id
+        ).yield_per(self.config.load_batch):
+            for user_id in (follower_id, followed_id):
+                if user_id not in ids:
+                    ids[user_id] = len(names)
+                    names.append(user_id)
+            sources.append(ids[follower_id])
+            targets.append(ids[followed_id])
+
+        sources = np.array(sources, dtype=np.int32)
+        targets = np.array(targets, dtype=np.int32)
+        following = _Adjacency.from_edges(sources, targets, len(names))
+        followers = _Adjacency.from_edges(targets, sources, len(names))
+
+        with self._lock:
+            self._ids, self._names = ids, names
+            self._following, self._followers = following, followers
+            replay, self._replay = self._replay or [], None
+            for followed, follower_id, followed_id in replay:
+                self._apply(followed, follower_id, followed_id)
+            self._ready = True
+
+    def _intern(self, user_id: str) -> int:
+        node = self._ids.get(user_id)
+        if node is None:
+            node = self._ids[user_id] = len(self._names)
+            self._names.append(user_id)
+        return node
+
+    def on_follow(self, follower_id: str, followed_id: str):
+        """关注后更新关系图"""
+        if not self._ready:
+            return
+        with self._lock:
+            self._apply(True, follower_id, followed_id)
+
+    def on_unfollow(self, follower_id: str, followed_id: str):
+        """取消关注后更新关系图"""
+        if not self._ready:
+            return
+        with self._lock:
+            self._apply(False, follower_id, followed_id)
+
+    def _apply(self, followed: bool, follower_id: str, followed_id: str):
+        """记录一条关注或取消关注（调用方持有锁）"""
+        if self._replay is not None:
+            self._replay.append((followed, follower_id, followed_id))
+
+        if followed:
+            follower, followed_node = self._intern(follower_id), self._intern(followed_id)
+            self._following.add(follower, followed_node)
+            self._followers.add(followed_node, follower)
+        else:
+            follower, followed_node = self._ids.get(follower_id), self._ids.get(followed_id)
+            if follower is None or followed_node is None:
+                return
+            self._following.remove(follower, followed_node)
+            self._followers.remove(followed_node, follower)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        """增量累积到阈值后合并进CSR数组（调用方持有锁）"""
+        if self._following.delta_count < self.config.compact_threshold:
+            return
+        size = len(self._names)
+        sources, targets = self._following.edges(size)
+        self._following = _Adjacency.from_edges(sources, targets, size)
+        self._followers = _Adjacency.from_edges(targets, sources, size)
+
+    def mutual_follows(self, user_id: str) -> Optional[List[str]]:
+        """互相关注的用户，关系图不可用时返回None"""
+        if not self._ready:
+            return None
+        with self._lock:
+            node = self._ids.get(user_id)
+            if node is None:
+                return []
+            mutual = np.intersect1d(self._following.neighbors(node), self._followers.neighbors(node), assume_unique=True)
+            return [self._names[other] for other in mutual.tolist()]
+
+    def suggestions(self, user_id: str, limit: int = 10) -> Optional[List[Tuple[str, int]]]:
+        """关注的人所关注的用户，按共同关注人数降序，返回 (用户ID, 共同关注人数)；关系图不可用时返回None"""
+        if not self._ready:
+            return None
+        with self._lock:
+            node = self._ids.get(user_id)
+            if node is None:
+                return []
+            following = self._following.neighbors(node)
+            if not len(following):
+                return []
+
+            candidates = self._following.gather(following)
+            candidates = candidates[(candidates != node) & ~np.isin(candidates, following)]
+            if not len(candidates):
+                return []
+
+            users, counts = np.unique(candidates, return_counts=True)
+            # 共同关注人数相同时按用户ID的内部编号排序，保证结果稳定
+            order = np.lexsort((users, -counts))[:limit]
+            return [(self._names[users[index]], int(counts[index])) for index in order.tolist()]
+
+    def shutdown(self):
+        """停止后台重建线程"""
+        self._stopped.set()
+
+    def _run(self):
+        """后台定期重建"""
+        while not self._stopped.wait(self.config.resync_interval):
+            try:
+                with self._app.app_context():
+                    self.rebuild()
+            except Exception as e:
+                self._app.logger.warning(f"Follow graph resync failed: {e}")
+
+    def stats(self) -> Dict:
+        """关系图规模及内存占用"""
+        with self._lock:
+            return {
+                'enabled': self.config.enabled,
+                'ready': self._ready,
+                'users': len(self._names),
+                'edges': int(len(self._following.indices)) + sum(map(len, self._following.added.values()))
+                         - sum(map(len, self._following.removed.values())),
+                'pending_deltas': self._following.delta_count,
+                'bytes': self._following.nbytes() + self._followers.nbytes()
+            }
+
+# 全局关注关系图实例
+follow_graph = FollowGraph()
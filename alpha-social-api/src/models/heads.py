@@ -0,0 +1,141 @@
+"""
+区块头订阅
+通过WebSocket订阅 chain_subscribeNewHeads，在内存中保存最新区块头、区块高度及链名称，断线后自动重连
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import aiohttp
+
+class HeadSubscription:
+    """最新区块头订阅"""
+
+    def __init__(self, config, transport):
+        # config 为 BlockchainConfig，transport 为 AsyncRPCTransport，订阅任务运行在其事件循环中
+        self.config = config
+        self.transport = transport
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._started = False
+        self._connected = False
+        self._chain: Optional[str] = None
+        self._head: Optional[Dict] = None
+        self._received_at = 0.0
+        self._reconnect_delay = 1.0
+        self._reconnects = 0
+        self._last_error: Optional[str] = None
+
+    def start(self):
+        """启动后台订阅任务"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.transport.spawn(self._run())
+
+    def add_listener(self, listener: Callable[[Dict], None]):
+        """新区块头及其哈希到达后回调 listener(head)，在事件循环线程中执行"""
+        self._listeners.append(listener)
+
+    def latest(self) -> Optional[Dict]:
+        """订阅正常且区块头未过期时返回最新区块头信息，否则返回None"""
+        with self._lock:
+            if not self._connected or self._head is None:
+                return None
+            age = time.monotonic() - self._received_at
+            if age > self.config.head_stale_after:
+                return None
+            return {**self._head, 'chain': self._chain, 'age': round(age, 3)}
+
+    def status(self) -> Dict:
+        """订阅状态；source 表示区块信息当前来自订阅缓存还是HTTP请求"""
+        head = self.latest()
+        with self._lock:
+            return {
+                'source': 'subscription' if head else 'rpc',
+                'connected': self._connected,
+                'block_number': self._head['number'] if self._head else None,
+                'block_hash': self._head['hash'] if self._head else None,
+                'age': round(time.monotonic() - self._received_at, 3) if self._head else None,
+                'stale_after': self.config.head_stale_after,
+                'reconnects': self._reconnects,
+                'last_error': self._last_error
+            }
+
+    async def _run(self):
+        """订阅循环，断线后按指数退避重连"""
+        while True:
+            try:
+                await self._listen()
+                self._last_error = 'Subscription closed by node'
+            except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError, ValueError, KeyError) as e:
+                self._last_error = str(e) or type(e).__name__
+
+            with self._lock:
+                self._connected = False
+            self._reconnects += 1
+            await asyncio.sleep(self._reconnect_delay * random.uniform(0.5, 1.0))
+            self._reconnect_delay = min(self._reconnect_delay * 2, self.config.ws_reconnect_max)
+
+    async def _listen(self):
+        """建立连接并处理订阅消息，连接断开时返回"""
+        pending = {}
+
+        async with self.transport.get_session().ws_connect(
+            self.config.ws_url, heartbeat=self.config.ws_heartbeat, timeout=aiohttp.ClientWSTimeout(ws_close=10)
+        ) as ws:
+
+            async def request(method: str, params: List, handler: Callable[[Dict], None]):
+                request_id = next(self._ids)
+                pending[request_id] = handler
+                await ws.send_json({"jsonrpc": "2.0", "method": method, "params": params, "id": request_id})
+
+            def on_chain(response: Dict):
+                self._chain = response.get('result')
+
+            def on_subscribed(response: Dict):
+                if 'error' in response:
+                    raise ConnectionError(f"chain_subscribeNewHeads failed: {response['error']}")
+                with self._lock:
+                    self._connected = True
+                self._reconnect_delay = 1.0
+                self._last_error = None
+
+            await request("system_chain", [], on_chain)
+            await request("chain_subscribeNewHeads", [], on_subscribed)
+
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                data = json.loads(message.data)
+
+                handler = pending.pop(data.get('id'), None) if 'id' in data else None
+                if handler:
+                    handler(data)
+                elif data.get('method') == 'chain_newHead':
+                    header = data['params']['result']
+                    number = int(header['number'], 16)
+                    with self._lock:
+                        self._head = {'number': number, 'hash': None, 'header': header}
+                        self._received_at = time.monotonic()
+                    # 区块头通知不含区块哈希，在同一连接上补查
+                    await request("chain_getBlockHash", [number], self._hash_handler(number))
+
+    def _hash_handler(self, number: int) -> Callable[[Dict], None]:
+        def on_hash(response: Dict):
+            block_hash = response.get('result')
+            with self._lock:
+                if not block_hash or self._head is None or self._head['number'] != number:
+                    return
+                self._head['hash'] = block_hash
+                head = dict(self._head)
+            for listener in self._listeners:
+                listener(head)
+        return on_hash
@@ -0,0 +1,322 @@
+"""
+关系成员索引
+在内存中维护每个用户的点赞目标和关注对象，未点赞、未关注的检查结果直接由索引给出，无需查询数据库
+"""
+
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.models.user import db
+
+@dataclass
+class MembershipConfig:
+    """成员索引配置"""
+    enabled: bool = True  # 关闭时状态检查直接查询数据库
+    max_entries: int = 5000000  # 索引保存的最大关系数，超出后不再载入新关系，未命中需查询数据库确认
+    warm_up_batch: int = 10000  # 预热及同步时每批读取的记录数
+    sync_interval: float = 1.0  # 载入其他进程新写入关系的间隔（秒），为0时不同步（仅适用于单进程部署）
+    sync_overlap: int = 1000  # 同步时重新读取水位线之前的记录数，覆盖删除最新记录后被复用的ID
+    stale_after: float = 10.0  # 超过该时间（秒）未同步成功时，未命中需查询数据库确认
+
+class MembershipSet:
+    """单类关系的成员集合，每个用户对应一个有序数组"""
+
+    def __init__(self, typecode: str = None):
+        # typecode 为空时以有序列表保存字符串ID，否则以 array 紧凑保存整数ID
+        self.typecode = typecode
+        self._members: Dict[str, object] = {}
+        self.entries = 0
+
+    def _new(self, values: Iterable = ()):
+        return array(self.typecode, values) if self.typecode else list(values)
+
+    def load(self, pairs: Iterable[Tuple[str, object]]):
+        """按 (用户ID, 成员ID) 批量载入"""
+        grouped: Dict[str, List] = {}
+        for owner, member in pairs:
+            grouped.setdefault(owner, []).append(member if self.typecode else sys.intern(member))
+        self._members = {
+            sys.intern(owner): self._new(sorted(set(members)))
+            for owner, members in grouped.items()
+        }
+        self.entries = sum(map(len, self._members.values()))
+
+    def contains(self, owner: str, member) -> bool:
+        members = self._members.get(owner)
+        if not members:
+            return False
+        index = bisect_left(members, member)
+        return index < len(members) and members[index] == member
+
+    def filter(self, owner: str, candidates: Iterable) -> Set:
+        """返回候选中属于该用户的成员"""
+        members = self._members.get(owner)
+        if not members:
+            return set()
+        return {member for member in candidates if self.contains(owner, member)}
+
+    def add(self, owner: str, member):
+        members = self._members.get(owner)
+        if members is None:
+            members = self._members[sys.intern(owner)] = self._new()
+        index = bisect_left(members, member)
+        if index == len(members) or members[index] != member:
+            members.insert(index, member)
+            self.entries += 1
+
+    def remove(self, owner: str, member):
+        members = self._members.get(owner)
+        if not members:
+            return
+        index = bisect_left(members, member)
+        if index < len(members) and members[index] == member:
+            del members[index]
+            self.entries -= 1
+            if not members:
+                del self._members[owner]
+
+    def stats(self) -> Dict:
+        """成员数量及近似内存占用"""
+        total = sys.getsizeof(self._members)
+        strings = set()
+        for owner, members in self._members.items():
+            total += sys.getsizeof(members)
+            strings.add(owner)
+            if not self.typecode:
+                strings.update(members)
+        total += sum(sys.getsizeof(value) for value in strings)
+        return {'users': len(self._members), 'entries': self.entries, 'bytes': total}
+
+class MembershipIndex:
+    """点赞、关注关系的成员索引
+
+    本进程的写操作提交事务后同步更新索引，其他进程新增的关系由后台线程按ID水位线定期载入。
+    全部关系都已载入且同步未过期时，未命中直接视为否定；命中只说明可能存在
+    （其他进程的取消点赞、取消关注不会同步），由调用方查询数据库确认，确认不存在时调用 discard 移除。
+    """
+
+    like_target_types = ('content', 'comment')
+
+    def __init__(self, config: MembershipConfig = None):
+        self.config = config or MembershipConfig()
+        self._lock = threading.Lock()
+        self._likes = {target_type: MembershipSet('q') for target_type in self.like_target_types}
+        self._follows = MembershipSet()
+        self._ready = False
+        self._complete = False
+        self._like_watermark = 0
+        self._follow_watermark = 0
+        self._synced_at = 0.0
+        self._stopped = threading.Event()
+        self._thread = None
+        self._app = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready
+
+    @property
+    def authoritative(self) -> bool:
+        """未命中是否可以直接视为否定"""
+        if not self._complete:
+            return False
+        return self.config.sync_interval <= 0 or time.monotonic() - self._synced_at <= self.config.stale_after
+
+    def init_app(self, app):
+        """启动时从数据库预热索引，并启动后台同步线程"""
+        self._app = app
+        self.config.enabled = app.config.get('MEMBERSHIP_INDEX_ENABLED', self.config.enabled)
+        self.config.max_entries = app.config.get('MEMBERSHIP_INDEX_MAX_ENTRIES', self.config.max_entries)
+        self.config.sync_interval = app.config.get('MEMBERSHIP_INDEX_SYNC_INTERVAL', self.config.sync_interval)
+        if not self.config.enabled:
+            return
+
+        with app.app_context():
+            self.warm_up()
+
+        if self.config.sync_interval > 0:
+            self._thread = threading.Thread(target=self._run, name='membership-sync', daemon=True)
+            self._thread.start()
+
+    def warm_up(self):
+        """从数据库载入点赞和关注关系，最多载入 max_entries 条"""
+        from src.models.content import Like
+        from src.models.social import Follow
+
+        batch = self.config.warm_up_batch
+        limit = self.config.max_entries
+        complete = True
+
+        # 先取水位线，此后写入的记录由同步载入
+        like_watermark = db.session.query(db.func.coalesce(db.func.max(Like.id), 0)).scalar()
+        follow_watermark = db.session.query(db.func.coalesce(db.func.max(Follow.id), 0)).scalar()
+
+        likes = {target_type: [] for target_type in self.like_target_types}
+        loaded = 0
+        for user_id, target_type, target_id in db.session.query(
+            Like.user_id, Like.target_type, Like.target_id
+        ).filter(
+            Like.id <= like_watermark, Like.target_type.in_(self.like_target_types)
+        ).limit(limit + 1).yield_per(batch):
+            if loaded == limit:
+                complete = False
+                break
+            likes[target_type].append((user_id, target_id))
+            loaded += 1
+
+        follows = db.session.query(Follow.follower_id, Follow.followed_id).filter(
+            Follow.id <= follow_watermark
+        ).limit(limit - loaded + 1).all()
+        if len(follows) > limit - loaded:
+            complete = False
+            follows = follows[:limit - loaded]
+
+        with self._lock:
+            for target_type, pairs in likes.items():
+                self._likes[target_type].load(pairs)
+            self._follows.load(follows)
+            self._like_watermark, self._follow_watermark = like_watermark, follow_watermark
+            self._complete = complete
+            self._synced_at = time.monotonic()
+            self._ready = True
+
+    def sync(self):
+        """载入水位线之后写入的点赞、关注关系（包括其他进程的写入）"""
+        from src.models.content import Like
+        from src.models.social import Follow
+
+        if not self._ready:
+            return
+        started_at = time.monotonic()
+        batch = self.config.warm_up_batch
+
+        while True:
+            rows = db.session.query(Like.id, Like.user_id, Like.target_type, Like.target_id).filter(
+                Like.id > self._like_watermark - self.config.sync_overlap
+            ).order_by(Like.id).limit(batch).all()
+            with self._lock:
+                for _, user_id, target_type, target_id in rows:
+                    if target_type in self._likes:
+                        self._add(self._likes[target_type], user_id, target_id)
+                self._like_watermark = max([self._like_watermark] + [row.id for row in rows])
+            if len(rows) < batch:
+                break
+
+        while True:
+            rows = db.session.query(Follow.id, Follow.follower_id, Follow.followed_id).filter(
+                Follow.id > self._follow_watermark - self.config.sync_overlap
+            ).order_by(Follow.id).limit(batch).all()
+            with self._lock:
+                for _, follower_id, followed_id in rows:
+                    self._add(self._follows, follower_id, followed_id)
+                self._follow_watermark = max([self._follow_watermark] + [row.id for row in rows])
+            if len(rows) < batch:
+                break
+
+        self._synced_at = started_at
+
+    def shutdown(self):
+        """停止后台同步线程"""
+        self._stopped.set()
+
+    def _run(self):
+        """后台定期同步"""
+        while not self._stopped.wait(self.config.sync_interval):
+            try:
+                with self._app.app_context():
+                    self.sync()
+            except Exception as e:
+                self._app.logger.warning(f"Membership index sync failed: {e}")
+
+    def is_liked(self, user_id: str, target_type: str, target_id: int) -> Optional[bool]:
+        """检查点赞状态：False 为确定未点赞，True 需查询数据库确认，无法由索引确定时返回None"""
+        if not self._ready or target_type not in self._likes:
+            return None
+        with self._lock:
+            if self._likes[target_type].contains(user_id, target_id):
+                return True
+        return False if self.authoritative else None
+
+    def liked_ids(self, user_id: str, target_type: str, target_ids: Iterable[int]) -> Tuple[Set[int], Set[int]]:
+        """批量检查点赞状态，返回 (需查询数据库确认的已点赞ID, 无法由索引确定的ID)"""
+        target_ids = set(target_ids)
+        if not self._ready or target_type not in self._likes:
+            return set(), target_ids
+        with self._lock:
+            liked = self._likes[target_type].filter(user_id, target_ids)
+        return liked, set() if self.authoritative else target_ids - liked
+
+    def is_following(self, follower_id: str, followed_id: str) -> Optional[bool]:
+        """检查关注状态：False 为确定未关注，True 需查询数据库确认，无法由索引确定时返回None"""
+        if not self._ready:
+            return None
+        with self._lock:
+            if self._follows.contains(follower_id, followed_id):
+                return True
+        return False if self.authoritative else None
+
+    def on_like(self, user_id: str, target_type: str, target_id: int, liked: bool):
+        """点赞状态变更后更新索引"""
+        if not self._ready or target_type not in self._likes:
+            return
+        with self._lock:
+            if liked:
+                self._add(self._likes[target_type], user_id, target_id)
+            else:
+                self._likes[target_type].remove(user_id, target_id)
+
+    def discard_likes(self, user_id: str, target_type: str, target_ids: Iterable[int]):
+        """移除经数据库确认已不存在的点赞（如其他进程取消的点赞）"""
+        if not self._ready or target_type not in self._likes:
+            return
+        with self._lock:
+            for target_id in target_ids:
+                self._likes[target_type].remove(user_id, target_id)
+
+    def on_follow(self, follower_id: str, followed_id: str):
+        """关注后更新索引"""
+        if not self._ready:
+            return
+        with self._lock:
+            self._add(self._follows, follower_id, followed_id)
+
+    def on_unfollow(self, follower_id: str, followed_id: str):
+        """取消关注后更新索引"""
+        if not self._ready:
+            return
+        with self._lock:
+            self._follows.remove(follower_id, followed_id)
+
+    def _add(self, members: MembershipSet, owner: str, member):
+        """写入关系，达到容量上限后不再写入，此后未命中都需要查询数据库确认（调用方持有锁）"""
+        if self._entries() >= self.config.max_entries:
+            self._complete = False
+            return
+        members.add(owner, member)
+
+    def _entries(self) -> int:
+        return self._follows.entries + sum(members.entries for members in self._likes.values())
+
+    def stats(self) -> Dict:
+        """索引规模及近似内存占用"""
+        with self._lock:
+            sets = {f'likes_{target_type}': self._likes[target_type].stats() for target_type in self.like_target_types}
+            sets['follows'] = self._follows.stats()
+        return {
+            'enabled': self.config.enabled,
+            'ready': self._ready,
+            'complete': self._complete,
+            'synced_age': round(time.monotonic() - self._synced_at, 3) if self._ready else None,
+            'authoritative': self.authoritative,
+            'max_entries': self.config.max_entries,
+            'sets': sets,
+            'total_bytes': sum(item['bytes'] for item in sets.values())
+        }
+
+# 全局关系成员索引实例
+membership_index = MembershipIndex()
@@ -0,0 +1,216 @@
+"""
+链上交易发件箱
+链上写操作先与业务数据在同一事务中写入发件箱，由后台工作线程提交到区块链，失败时按指数退避重试
+"""
+
+import json
+import random
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from src.models.user import db
+
+@dataclass
+class OutboxConfig:
+    """发件箱配置"""
+    workers: int = 2  # 提交交易的工作线程数
+    max_attempts: int = 8  # 最大提交次数，超过后标记为失败
+    base_backoff: float = 1.0  # 首次重试的等待时间（秒），之后每次翻倍
+    max_backoff: float = 300.0  # 重试等待时间上限（秒）
+    poll_interval: float = 1.0  # 没有新交易时检查到期重试的间隔（秒）
+    lease_timeout: float = 120.0  # 提交中的交易超过该时间未完成时视为工作线程异常，重新提交
+
+class ChainTransaction(db.Model):
+    """发件箱交易模型"""
+    __tablename__ = 'tx_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)  # 区块链客户端方法名
+    payload = db.Column(db.Text, nullable=False)  # 调用参数（JSON）
+    context = db.Column(db.Text)  # 提交成功后回调使用的业务信息（JSON）
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, submitting, submitted, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    tx_hash = db.Column(db.String(66))
+    block_hash = db.Column(db.String(66))
+    events = db.Column(db.Text)  # 链上事件（JSON）
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_tx_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def to_ref(self) -> Dict:
+        """返回给客户端的交易引用，需在提交事务前调用，返回写入时的状态（提交后工作线程可能已在处理）"""
+        return {'id': self.id, 'status': self.status}
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'tx_hash': self.tx_hash,
+            'block_hash': self.block_hash,
+            'events': json.loads(self.events) if self.events else [],
+            'error': self.error,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at and self.status == 'pending' else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class TransactionOutbox:
+    """链上交易发件箱"""
+
+    # 允许通过发件箱调用的区块链客户端方法
+    kinds = ('create_post', 'create_posts', 'like_post', 'follow_user', 'follow_users', 'send_private_message')
+
+    # 到期可领取的交易：等待提交且已到重试时间，或提交中但租约已过期
+    _due = (
+        "((status = 'pending' AND next_attempt_at <= :now) OR "
+        "(status = 'submitting' AND updated_at <= :lease_expired))"
+    )
+
+    def __init__(self, config: OutboxConfig = None):
+        self.config = config or OutboxConfig()
+        self._hooks: Dict[str, Callable] = {}
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._app = None
+
+    def init_app(self, app):
+        """启动提交工作线程"""
+        self._app = app
+        self.config.workers = app.config.get('TX_OUTBOX_WORKERS', self.config.workers)
+        self.config.max_attempts = app.config.get('TX_OUTBOX_MAX_ATTEMPTS', self.config.max_attempts)
+
+        for index in range(self.config.workers):
+            thread = threading.Thread(target=self._run, name=f'tx-outbox-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def register_hook(self, kind: str, hook: Callable):
+        """注册提交成功后的回调 hook(context, result)，在提交状态保存后执行，失败时记录到交易的 error 字段"""
+        self._hooks[kind] = hook
+
+    def enqueue(self, kind: str, payload: Dict, context: Dict = None) -> ChainTransaction:
+        """写入待提交交易（不提交事务），调用方提交事务后调用 notify 唤醒工作线程"""
+        if kind not in self.kinds:
+            raise ValueError(f'Unsupported transaction kind: {kind}')
+
+        transaction = ChainTransaction(
+            kind=kind,
+            payload=json.dumps(payload),
+            context=json.dumps(context) if context is not None else None,
+            status='pending'
+        )
+        db.session.add(transaction)
+        db.session.flush()
+        return transaction
+
+    def notify(self):
+        """唤醒工作线程"""
+        self._wakeup.set()
+
+    def get(self, transaction_id: int) -> Optional[ChainTransaction]:
+        """获取交易"""
+        return db.session.get(ChainTransaction, transaction_id)
+
+    def _claim(self) -> Optional[ChainTransaction]:
+        """领取一笔到期的交易，条件更新保证多个工作线程不会重复领取；先以只读查询检查，没有到期交易时不占用写锁"""
+        now = datetime.utcnow()
+        params = {'now': now, 'lease_expired': now - timedelta(seconds=self.config.lease_timeout)}
+        due = db.session.execute(text(
+            f"SELECT 1 FROM tx_outbox WHERE {self._due} LIMIT 1"
+        ), params).first()
+        db.session.rollback()
+        if due is None:
+            return None
+
+        row = db.session.execute(text(
+            "UPDATE tx_outbox SET status = 'submitting', attempts = attempts + 1, updated_at = :now "
+            f"WHERE id = (SELECT id FROM tx_outbox WHERE {self._due} "
+            "ORDER BY next_attempt_at, id LIMIT 1) "
+            "RETURNING id"
+        ), params).first()
+        db.session.commit()
+        return db.session.get(ChainTransaction, row.id) if row else None
+
+    def process_one(self) -> bool:
+        """提交一笔到期的交易，没有到期交易时返回False"""
+        from src.models.blockchain import blockchain_client
+
+        transaction = self._claim()
+        if transaction is None:
+            return False
+
+        try:
+            result = getattr(blockchain_client, transaction.kind)(**json.loads(transaction.payload))
+            error = None if result.success else (result.error or 'Transaction rejected')
+        except Exception as e:
+            result, error = None, str(e) or type(e).__name__
+
+        now = datetime.utcnow()
+        transaction.updated_at = now
+        if error is None:
+            transaction.status = 'submitted'
+            transaction.tx_hash = result.tx_hash
+            transaction.block_hash = result.block_hash
+            transaction.events = json.dumps(result.events or [])
+            transaction.error = None
+        elif transaction.attempts >= self.config.max_attempts:
+            transaction.status = 'failed'
+            transaction.error = error
+        else:
+            transaction.status = 'pending'
+            transaction.error = error
+            transaction.next_attempt_at = now + timedelta(seconds=self._backoff(transaction.attempts))
+        db.session.commit()
+
+        hook = self._hooks.get(transaction.kind)
+        if error is None and hook:
+            self._run_hook(transaction, hook, result)
+        return True
+
+    def _run_hook(self, transaction: ChainTransaction, hook: Callable, result):
+        """执行提交成功后的回调；交易已上链，回调失败时只记录错误，不重新提交"""
+        try:
+            hook(json.loads(transaction.context) if transaction.context else {}, result)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            transaction.error = f'Hook failed: {str(e) or type(e).__name__}'
+            db.session.commit()
+
+    def _backoff(self, attempts: int) -> float:
+        """第N次失败后的等待时间：指数退避加随机抖动"""
+        delay = min(self.config.base_backoff * 2 ** (attempts - 1), self.config.max_backoff)
+        return delay * random.uniform(0.5, 1.0)
+
+    def shutdown(self):
+        """停止工作线程"""
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _run(self):
+        """工作线程循环"""
+        while not self._stopped.is_set():
+            try:
+                with self._app.app_context():
+                    while not self._stopped.is_set() and self.process_one():
+                        pass
+            except Exception as e:
+                self._app.logger.warning(f"Transaction outbox worker failed: {e}")
+
+            self._wakeup.wait(self.config.poll_interval)
+            self._wakeup.clear()
+
+# 全局链上交易发件箱实例
+tx_outbox = TransactionOutbox()
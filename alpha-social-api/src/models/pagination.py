@@ -0,0 +1,49 @@
+"""
+游标分页工具
+游标为编码了 (created_at, id) 的不透明令牌，列表按 created_at、id 倒序翻页
+"""
+
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+Cursor = Tuple[datetime, int]
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """生成游标令牌"""
+    raw = f"{created_at.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    """解析游标令牌，令牌无效时抛出 ValueError"""
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, item_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+def apply_cursor(query, created_at_column, id_column, cursor: Optional[Cursor], reverse: bool = False):
+    """按游标过滤并排序查询，默认取游标之前（更早）的记录"""
+    key = tuple_(created_at_column, id_column)
+
+    if reverse:
+        if cursor:
+            query = query.filter(key > tuple_(*cursor))
+        return query.order_by(created_at_column.asc(), id_column.asc())
+
+    if cursor:
+        query = query.filter(key < tuple_(*cursor))
+    return query.order_by(created_at_column.desc(), id_column.desc())
+
+def next_cursor(items: List, limit: int) -> Optional[str]:
+    """根据本页最后一条记录生成下一页游标"""
+    if len(items) < limit or not items:
+        return None
+    last = items[-1]
+    return encode_cursor(last.created_at, last.id)
@@ -0,0 +1,221 @@
+"""
+异步JSON-RPC传输
+在后台事件循环线程中复用长连接发送请求，短时间内的并发调用合并为JSON-RPC批量请求，并提供同步调用接口
+"""
+
+import asyncio
+import atexit
+import itertools
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import aiohttp
+
+from src.models.rpc_pool import EndpointPool
+
+class AsyncRPCTransport:
+    """异步JSON-RPC传输"""
+
+    def __init__(self, config):
+        # config 为 BlockchainConfig，读取 rpc_url 及传输相关配置
+        self.config = config
+        self.pool = EndpointPool(config)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._pending: List[Tuple[Dict, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._start_callbacks: List[Callable[[], None]] = []
+
+    def on_start(self, callback: Callable[[], None]):
+        """注册事件循环启动时执行的回调（如健康探测、订阅），事件循环已启动时立即执行"""
+        with self._lock:
+            started = self._loop is not None
+            if not started:
+                self._start_callbacks.append(callback)
+        if started:
+            callback()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """首次发起请求时启动后台事件循环线程并执行启动回调，导入应用或执行CLI命令不会启动线程"""
+        with self._lock:
+            loop = self._loop
+            if loop is None:
+                loop = self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name='rpc-transport', daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+                callbacks, self._start_callbacks = self._start_callbacks, []
+            else:
+                callbacks = []
+        for callback in callbacks:
+            callback()
+        return loop
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """共享会话，连接池复用长连接（须在事件循环中调用）"""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.config.max_connections, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.config.rpc_timeout),
+                headers={'Content-Type': 'application/json'}
+            )
+        return self._session
+
+    def _request(self, method: str, params: List = None) -> Dict:
+        return {
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params or [],
+            "id": next(self._ids)
+        }
+
+    async def call(self, method: str, params: List = None) -> Dict:
+        """发起单个调用，批量窗口内的其他调用会与之合并发送"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((self._request(method, params), future))
+
+        if len(self._pending) >= self.config.max_batch_size or self.config.batch_window <= 0:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.config.batch_window, self._flush)
+        return await future
+
+    async def batch(self, calls: List[Tuple[str, List]]) -> List[Dict]:
+        """以一个JSON-RPC批量请求发起多个调用，按调用顺序返回结果"""
+        loop = asyncio.get_running_loop()
+        pending = [(self._request(method, params), loop.create_future()) for method, params in calls]
+        await self._send(pending)
+        return [future.result() for _, future in pending]
+
+    def _flush(self):
+        """发送批量窗口内累积的调用"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if pending:
+            # 保留任务引用，避免发送中的任务被回收
+            task = asyncio.get_running_loop().create_task(self._send_batch(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self, pending: List[Tuple[Dict, asyncio.Future]]):
+        """发送一批调用，发送过程中出现任何异常（包括任务被取消）时，未完成的调用都返回错误信息"""
+        try:
+            await self._send(pending)
+        except asyncio.CancelledError:
+            self._fail(pending, 'RPC transport shut down')
+            raise
+        except Exception as e:
+            self._fail(pending, str(e) or type(e).__name__)
+
+    @staticmethod
+    def _fail(pending: List[Tuple[Dict, asyncio.Future]], error: str):
+        """未完成的调用返回错误信息"""
+        for _, future in pending:
+            if not future.done():
+                future.set_result({"error": error})
+
+    async def _send(self, pending: List[Tuple[Dict, asyncio.Future]]):
+        """发送请求并按ID分发响应；网络错误时所有调用都返回错误信息"""
+        payload = [request for request, _ in pending] if len(pending) > 1 else pending[0][0]
+
+        tried = set()
+        endpoint = self.pool.select()
+        while True:
+            tried.add(endpoint.url)
+            endpoint.inflight += 1
+            started = time.monotonic()
+            error, retryable = None, False
+            try:
+                async with self.get_session().post(endpoint.url, json=payload) as response:
+                    response.raise_for_status()
+                    body = await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                error = str(e) or type(e).__name__
+                body = {"error": error}
+                # 连接未建立时请求未发出，可以安全地换一个节点重试
+                retryable = isinstance(e, aiohttp.ClientConnectorError)
+            finally:
+                endpoint.inflight -= 1
+            self.pool.record(endpoint, time.monotonic() - started, error)
+
+            if not retryable:
+                break
+            endpoint = self.pool.select(exclude=tried)
+            if endpoint is None:
+                break
+
+        if isinstance(body, list):
+            responses = {item.get('id'): item for item in body if isinstance(item, dict)}
+        else:
+            # 单个调用的响应，或节点对整个批量请求返回的错误
+            responses = None
+
+        for request, future in pending:
+            if future.done():
+                continue
+            if responses is None:
+                future.set_result(body)
+            else:
+                future.set_result(responses.get(request['id'], {"error": "Missing response"}))
+
+    def start_health_checks(self):
+        """启动节点池的后台健康探测"""
+        self.spawn(self.pool.run(self.get_session))
+
+    def spawn(self, coroutine):
+        """在后台事件循环中运行常驻任务（如订阅），关闭传输时取消"""
+        loop = self._ensure_loop()
+
+        def start():
+            task = loop.create_task(coroutine)
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        loop.call_soon_threadsafe(start)
+
+    def _run(self, coroutine) -> Any:
+        """在后台事件循环中执行协程并等待结果"""
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+        return future.result(self.config.rpc_timeout + self.config.batch_window + 1)
+
+    def call_sync(self, method: str, params: List = None) -> Dict:
+        """同步发起单个调用"""
+        try:
+            return self._run(self.call(method, params))
+        except FutureTimeoutError:
+            return {"error": f"RPC call {method} timed out"}
+
+    def batch_sync(self, calls: List[Tuple[str, List]]) -> List[Dict]:
+        """同步发起批量调用"""
+        try:
+            return self._run(self.batch(calls))
+        except FutureTimeoutError:
+            return [{"error": f"RPC call {method} timed out"} for method, _ in calls]
+
+    def shutdown(self):
+        """关闭连接池并停止事件循环"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+
+        async def close():
+            for task in list(self._tasks):
+                task.cancel()
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+
+        try:
+            asyncio.run_coroutine_threadsafe(close(), loop).result(5)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,193 @@
+"""
+RPC节点池
+后台探测各节点的健康状态（system_health、对等节点数、区块高度落后程度），请求路由到健康且延迟最低的节点；
+连续失败的节点被摘除，探测恢复正常或摘除超时后重新加入
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+import aiohttp
+
+class RPCEndpoint:
+    """单个RPC节点的状态及统计"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.healthy = True
+        self.latency: Optional[float] = None  # 响应时间的指数移动平均（秒）
+        self.inflight = 0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.peers: Optional[int] = None
+        self.is_syncing: Optional[bool] = None
+        self.block_number: Optional[int] = None
+        self.head_lag: Optional[int] = None
+        self.last_probe_at: Optional[float] = None
+
+    def score(self) -> float:
+        """路由评分，越小越优先：平均延迟乘以排队中的请求数"""
+        return (self.latency or 0.0) * (self.inflight + 1)
+
+    def to_dict(self) -> Dict:
+        now = time.monotonic()
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'latency_ms': round(self.latency * 1000, 2) if self.latency is not None else None,
+            'inflight': self.inflight,
+            'requests': self.requests,
+            'errors': self.errors,
+            'consecutive_failures': self.consecutive_failures,
+            'ejections': self.ejections,
+            'last_error': self.last_error,
+            'peers': self.peers,
+            'is_syncing': self.is_syncing,
+            'block_number': self.block_number,
+            'head_lag': self.head_lag,
+            'last_probe_age': round(now - self.last_probe_at, 3) if self.last_probe_at is not None else None
+        }
+
+class EndpointPool:
+    """RPC节点池"""
+
+    latency_decay = 0.3  # 延迟移动平均中新样本的权重
+
+    def __init__(self, config):
+        # config 为 BlockchainConfig，未配置 rpc_urls 时只使用 rpc_url
+        self.config = config
+        self._lock = threading.Lock()
+        self.endpoints = [RPCEndpoint(url) for url in (config.rpc_urls or [config.rpc_url])]
+
+    def set_urls(self, urls: List[str]):
+        """替换节点列表，保留仍在列表中的节点的统计"""
+        with self._lock:
+            existing = {endpoint.url: endpoint for endpoint in self.endpoints}
+            self.endpoints = [existing.get(url) or RPCEndpoint(url) for url in urls]
+            self.config.rpc_urls = list(urls)
+            self.config.rpc_url = urls[0]
+
+    def select(self, exclude: Set[str] = None) -> Optional[RPCEndpoint]:
+        """选择健康且评分最低的节点；没有健康节点时选择最早被摘除的节点"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if not exclude or endpoint.url not in exclude]
+            if not candidates:
+                return None
+
+            available = [endpoint for endpoint in candidates if endpoint.healthy or self._half_open(endpoint, now)]
+            if available:
+                return min(available, key=RPCEndpoint.score)
+            return min(candidates, key=lambda endpoint: endpoint.ejected_at)
+
+    def _half_open(self, endpoint: RPCEndpoint, now: float) -> bool:
+        """因请求失败被摘除的节点在摘除超时后允许试探请求；探测判定不健康的节点需等待探测恢复"""
+        return endpoint.head_lag is None and now - endpoint.ejected_at >= self.config.readmit_after
+
+    def record(self, endpoint: RPCEndpoint, elapsed: float, error: Optional[str] = None):
+        """记录一次请求的结果，连续失败达到阈值时摘除节点"""
+        with self._lock:
+            endpoint.requests += 1
+            if error is None:
+                self._observe_latency(endpoint, elapsed)
+                endpoint.consecutive_failures = 0
+                if not endpoint.healthy and endpoint.head_lag is None:
+                    # 试探请求成功即重新加入
+                    endpoint.healthy = True
+                return
+
+            endpoint.errors += 1
+            endpoint.consecutive_failures += 1
+            endpoint.last_error = error
+            if endpoint.consecutive_failures >= self.config.eject_after:
+                self._eject(endpoint)
+
+    def _observe_latency(self, endpoint: RPCEndpoint, elapsed: float):
+        if endpoint.latency is None:
+            endpoint.latency = elapsed
+        else:
+            endpoint.latency += self.latency_decay * (elapsed - endpoint.latency)
+
+    def _eject(self, endpoint: RPCEndpoint):
+        """摘除节点（调用方持有锁）"""
+        if endpoint.healthy:
+            endpoint.ejections += 1
+        endpoint.healthy = False
+        endpoint.ejected_at = time.monotonic()
+
+    async def _probe(self, session: aiohttp.ClientSession, endpoint: RPCEndpoint) -> Optional[Dict]:
+        """以一个批量请求查询节点的 system_health 及最新区块头，失败时返回None"""
+        payload = [
+            {"jsonrpc": "2.0", "method": "system_health", "params": [], "id": 1},
+            {"jsonrpc": "2.0", "method": "chain_getHeader", "params": [], "id": 2}
+        ]
+        started = time.monotonic()
+        try:
+            async with session.post(
+                endpoint.url, json=payload, timeout=aiohttp.ClientTimeout(total=self.config.health_check_timeout)
+            ) as response:
+                response.raise_for_status()
+                body = await response.json(content_type=None)
+            responses = {item.get('id'): item for item in body}
+            health = responses[1]['result']
+            return {
+                'elapsed': time.monotonic() - started,
+                'peers': int(health.get('peers', 0)),
+                'is_syncing': bool(health.get('isSyncing', False)),
+                'should_have_peers': bool(health.get('shouldHavePeers', True)),
+                'block_number': int(responses[2]['result']['number'], 16)
+            }
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError, TypeError, AttributeError) as e:
+            with self._lock:
+                endpoint.last_error = f'Health check failed: {str(e) or type(e).__name__}'
+            return None
+
+    async def probe_all(self, session: aiohttp.ClientSession):
+        """并发探测全部节点，按探测结果摘除或重新加入节点"""
+        endpoints = list(self.endpoints)
+        results = await asyncio.gather(*(self._probe(session, endpoint) for endpoint in endpoints))
+        best = max((result['block_number'] for result in results if result), default=None)
+
+        now = time.monotonic()
+        with self._lock:
+            for endpoint, result in zip(endpoints, results):
+                endpoint.last_probe_at = now
+                if result is None:
+                    endpoint.head_lag = None
+                    self._eject(endpoint)
+                    continue
+
+                self._observe_latency(endpoint, result['elapsed'])
+                endpoint.peers = result['peers']
+                endpoint.is_syncing = result['is_syncing']
+                endpoint.block_number = result['block_number']
+                endpoint.head_lag = best - result['block_number']
+
+                if result['is_syncing']:
+                    endpoint.last_error = 'Node is syncing'
+                elif result['should_have_peers'] and not result['peers']:
+                    endpoint.last_error = 'Node has no peers'
+                elif endpoint.head_lag > self.config.max_head_lag:
+                    endpoint.last_error = f'Node is {endpoint.head_lag} blocks behind'
+                else:
+                    endpoint.healthy = True
+                    endpoint.consecutive_failures = 0
+                    continue
+                self._eject(endpoint)
+
+    async def run(self, session_factory):
+        """后台定期探测"""
+        while True:
+            await self.probe_all(session_factory())
+            await asyncio.sleep(self.config.health_check_interval)
+
+    def stats(self) -> List[Dict]:
+        """各节点的状态及统计"""
+        with self._lock:
+            return [endpoint.to_dict() for endpoint in self.endpoints]
@@ -0,0 +1,27 @@
+"""
+数据库结构维护
+补建已有数据表上缺失的列和索引（db.create_all 只创建不存在的表）
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from src.models.user import db
+
+def ensure_schema():
+    """创建缺失的表、列和索引"""
+    db.create_all()
+
+    # 新增的列只能为可空列，已有数据行的值为NULL
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                definition = CreateColumn(column).compile(dialect=db.engine.dialect)
+                db.session.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {definition}"))
+    db.session.commit()
+
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
@@ -0,0 +1,164 @@
+"""
+内容全文检索
+基于SQLite FTS5的内容标题、描述检索，按bm25相关度排序
+"""
+
+import re
+from typing import List
+
+import click
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from src.models.user import db
+
+# 中日韩字符：逐字切分为独立的词元，unicode61分词器不会切分连续的CJK文本
+CJK_PATTERN = re.compile(
+    r'([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff])'
+)
+TOKEN_PATTERN = re.compile(r'\w+')
+
+class ContentSearchIndex:
+    """内容全文检索索引"""
+
+    table_name = 'contents_fts'
+
+    # 标题命中的权重高于描述
+    title_weight = 2.0
+    description_weight = 1.0
+
+    def __init__(self):
+        self.enabled = False
+
+    def init_app(self, app):
+        """创建FTS5虚拟表并注册回填命令"""
+        with app.app_context():
+            if db.engine.dialect.name == 'sqlite':
+                try:
+                    db.session.execute(text(
+                        f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table_name} "
+                        "USING fts5(title, description, tokenize='unicode61 remove_diacritics 2')"
+                    ))
+                    db.session.commit()
+                    self.enabled = True
+                except OperationalError:
+                    # SQLite未编译FTS5，退回LIKE检索
+                    db.session.rollback()
+
+        @app.cli.command('search-backfill')
+        @click.option('--batch-size', default=500, help='每批写入索引的内容数量')
+        def search_backfill(batch_size):
+            """为已有内容重建全文检索索引"""
+            if not self.enabled:
+                click.echo('FTS5 is not available, skipping backfill')
+                return
+            count = self.rebuild(batch_size)
+            click.echo(f'Indexed {count} contents')
+
+    @staticmethod
+    def segment(value: str) -> str:
+        """将CJK字符切分为独立词元"""
+        if not value:
+            return ''
+        return CJK_PATTERN.sub(r' \1 ', value)
+
+    def build_query(self, keyword: str) -> str:
+        """将关键词转换为FTS5短语前缀查询"""
+        tokens = TOKEN_PATTERN.findall(self.segment(keyword))
+        if not tokens:
+            return ''
+        return '"' + ' '.join(tokens) + '"*'
+
+    def index(self, content):
+        """写入或更新内容的索引（不提交事务）"""
+        self.index_many([content])
+
+    def index_many(self, contents: List):
+        """批量写入或更新内容的索引（不提交事务）"""
+        if not self.enabled or not contents:
+            return
+        db.session.execute(
+            text(f"DELETE FROM {self.table_name} WHERE rowid = :id"),
+            [{'id': content.id} for content in contents]
+        )
+        db.session.execute(
+            text(f"INSERT INTO {self.table_name} (rowid, title, description) "
+                 "VALUES (:id, :title, :description)"),
+            [
+                {
+                    'id': content.id,
+                    'title': self.segment(content.title),
+                    'description': self.segment(content.description)
+                }
+                for content in contents
+            ]
+        )
+
+    def remove(self, content_id: int):
+        """删除内容的索引（不提交事务）"""
+        if not self.enabled:
+            return
+        db.session.execute(
+            text(f"DELETE FROM {self.table_name} WHERE rowid = :id"),
+            {'id': content_id}
+        )
+
+    def search(self, keyword: str, limit: int = 20, offset: int = 0) -> List[int]:
+        """检索公开内容，返回按相关度排序的内容ID"""
+        query = self.build_query(keyword)
+        if not query:
+            return []
+
+        rows = db.session.execute(
+            text(f"SELECT c.id FROM {self.table_name} f "
+                 "JOIN contents c ON c.id = f.rowid "
+                 f"WHERE {self.table_name} MATCH :query "
+                 "AND c.is_deleted = 0 AND c.is_public = 1 "
+                 f"ORDER BY bm25({self.table_name}, :title_weight, :description_weight), "
+                 "c.created_at DESC "
+                 "LIMIT :limit OFFSET :offset"),
+            {
+                'query': query,
+                'title_weight': self.title_weight,
+                'description_weight': self.description_weight,
+                'limit': limit,
+                'offset': offset
+            }
+        )
+        return [row[0] for row in rows]
+
+    def rebuild(self, batch_size: int = 500) -> int:
+        """从contents表重建全部索引"""
+        db.session.execute(text(f"DELETE FROM {self.table_name}"))
+
+        count = 0
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                text("SELECT id, title, description FROM contents "
+                     "WHERE is_deleted = 0 AND id > :last_id ORDER BY id LIMIT :limit"),
+                {'last_id': last_id, 'limit': batch_size}
+            ).all()
+            if not rows:
+                break
+
+            db.session.execute(
+                text(f"INSERT INTO {self.table_name} (rowid, title, description) "
+                     "VALUES (:id, :title, :description)"),
+                [
+                    {
+                        'id': row.id,
+                        'title': self.segment(row.title),
+                        'description': self.segment(row.description)
+                    }
+                    for row in rows
+                ]
+            )
+            count += len(rows)
+            last_id = rows[-1].id
+
+        db.session.commit()
+        return count
+
+# 全局内容检索索引实例
+search_index = ContentSearchIndex()
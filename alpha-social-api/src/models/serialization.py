@@ -0,0 +1,200 @@
+"""
+内容列表序列化
+将数据库中规范化存储的JSON文本直接拼接进响应，避免逐行解析再重新编码
+"""
+
+import json
+from bisect import bisect_left
+from datetime import datetime
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable, Dict, List, Optional
+
+import click
+from sqlalchemy import bindparam
+from flask import Response, current_app, jsonify
+
+from src.models.user import db
+
+# 与 jsonify 非调试模式下的编码参数一致：键排序、紧凑分隔符、非ASCII字符转义
+_encode = json.JSONEncoder(ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode
+
+def dump_json(value: Any) -> str:
+    """以规范化格式编码JSON，存入数据库的文本与 jsonify 的输出逐字节一致"""
+    return _encode(value)
+
+def _string(value: Optional[str]) -> str:
+    """编码字符串字段"""
+    return 'null' if value is None else encode_basestring_ascii(value)
+
+def _scalar(value: Any) -> str:
+    """编码数值、布尔等标量字段"""
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if type(value) is int:
+        return int.__repr__(value)
+    return _encode(value)
+
+def _datetime(value: Optional[datetime]) -> str:
+    """编码时间字段"""
+    return 'null' if value is None else '"' + value.isoformat() + '"'
+
+class ContentSerializer:
+    """内容序列化器"""
+
+    # 以原始JSON文本拼接的字段及其为空时的取值，按键名排序
+    raw_fields = ('content_data', 'tags')
+    raw_defaults = {'content_data': 'null', 'tags': '[]'}
+
+    # 与 to_dict 输出一致的字段，按键名排序；模板中的 %s 依次对应各字段
+    template = (
+        '{"author_id":%s,"comment_count":%s,"content_data":%s,"content_hash":%s,'
+        '"content_type":%s,"created_at":%s,"description":%s,"file_size":%s,"id":%s,'
+        '"ipfs_hash":%s,"is_public":%s,"like_count":%s,"mime_type":%s,"share_count":%s,'
+        '"tags":%s,"title":%s,"updated_at":%s,"view_count":%s}'
+    )
+    template_fields = frozenset((
+        'author_id', 'comment_count', 'content_data', 'content_hash', 'content_type',
+        'created_at', 'description', 'file_size', 'id', 'ipfs_hash', 'is_public',
+        'like_count', 'mime_type', 'share_count', 'tags', 'title', 'updated_at', 'view_count'
+    ))
+
+    def init_app(self, app):
+        """注册历史数据规范化命令"""
+
+        @app.cli.command('contents-normalize-json')
+        @click.option('--batch-size', default=500, help='每批处理的内容数量')
+        def contents_normalize_json(batch_size):
+            """将历史内容的JSON字段改写为规范化格式"""
+            count = self.normalize(batch_size)
+            click.echo(f'Normalized {count} contents')
+
+    def content_json(self, content, extra: Dict = None) -> str:
+        """将内容编码为JSON文本，extra 中的字段覆盖或追加到输出中"""
+        content_data = content.content_data
+        tags = content.tags
+        if not content.json_normalized:
+            # 历史数据的存储格式与输出格式不一致，需要解析后重新编码
+            content_data = dump_json(json.loads(content_data)) if content_data else None
+            tags = dump_json(json.loads(tags)) if tags else None
+
+        if extra and not self.template_fields.issuperset(extra):
+            return self._content_json_segments(content, content_data, tags, extra)
+
+        view_count = content.view_count
+        like_count = content.like_count
+        if extra:
+            view_count = extra.get('view_count', view_count)
+            like_count = extra.get('like_count', like_count)
+
+        return self.template % (
+            _string(content.author_id),
+            _scalar(content.comment_count),
+            content_data or 'null',
+            _string(content.content_hash),
+            _string(content.content_type),
+            _datetime(content.created_at),
+            _string(content.description),
+            _scalar(content.file_size),
+            _scalar(content.id),
+            _string(content.ipfs_hash),
+            _scalar(content.is_public),
+            _scalar(like_count),
+            _string(content.mime_type),
+            _scalar(content.share_count),
+            tags or '[]',
+            _string(content.title),
+            _datetime(content.updated_at),
+            _scalar(view_count)
+        )
+
+    def _content_json_segments(self, content, content_data: Optional[str], tags: Optional[str], extra: Dict) -> str:
+        """包含额外字段时，按原始字段的位置分段编码后拼接"""
+        values = {
+            field: getattr(content, field)
+            for field in self.template_fields if field not in self.raw_fields
+        }
+        for field in ('created_at', 'updated_at'):
+            values[field] = values[field].isoformat() if values[field] else None
+        values.update(extra)
+        raw = {'content_data': content_data, 'tags': tags}
+
+        segments: List[Dict] = [{} for _ in range(len(self.raw_fields) + 1)]
+        for key, value in values.items():
+            segments[bisect_left(self.raw_fields, key)][key] = value
+
+        parts = []
+        for index, segment in enumerate(segments):
+            if segment:
+                parts.append(_encode(segment)[1:-1])
+            if index < len(self.raw_fields):
+                field = self.raw_fields[index]
+                parts.append(f'"{field}":{raw[field] or self.raw_defaults[field]}')
+        return '{' + ','.join(parts) + '}'
+
+    def list_response(self, contents: List, extra: Callable = None, **fields) -> Response:
+        """生成内容列表响应，其余顶层字段与 data 一起按键名排序输出"""
+        app = current_app
+        if app.json.compact is False or (app.json.compact is None and app.debug):
+            # 调试模式下 jsonify 会缩进输出，直接使用 jsonify 保持格式一致
+            data = []
+            for content in contents:
+                item = content.to_dict()
+                if extra:
+                    item.update(extra(content))
+                data.append(item)
+            return jsonify(data=data, **fields)
+
+        # 在返回响应前完成编码，出错时由路由的异常处理返回500，而不是输出截断的响应
+        parts = []
+        for key in sorted(list(fields) + ['data']):
+            if key != 'data':
+                parts.append(f'{_encode(key)}:{_encode(fields[key])}')
+                continue
+
+            items = [self.content_json(content, extra(content) if extra else None) for content in contents]
+            parts.append('"data":[' + ','.join(items) + ']')
+
+        return Response('{' + ','.join(parts) + '}\n', mimetype=app.json.mimetype)
+
+    def normalize(self, batch_size: int = 500) -> int:
+        """将历史内容的 content_data、tags 改写为规范化格式"""
+        from src.models.content import Content
+
+        contents = Content.__table__
+        # 显式保留 updated_at，格式改写不算内容编辑
+        statement = contents.update().where(contents.c.id == bindparam('content_id')).values(
+            content_data=bindparam('normalized_content_data'),
+            tags=bindparam('normalized_tags'),
+            json_normalized=True,
+            updated_at=contents.c.updated_at
+        )
+
+        count = 0
+        while True:
+            rows = db.session.execute(
+                db.select(contents.c.id, contents.c.content_data, contents.c.tags).where(
+                    db.or_(contents.c.json_normalized == None, contents.c.json_normalized == False)
+                ).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            db.session.execute(statement, [
+                {
+                    'content_id': row.id,
+                    'normalized_content_data': dump_json(json.loads(row.content_data)) if row.content_data else None,
+                    'normalized_tags': dump_json(json.loads(row.tags)) if row.tags else None
+                }
+                for row in rows
+            ])
+            db.session.commit()
+            count += len(rows)
+
+        return count
+
+# 全局内容序列化器实例
+content_serializer = ContentSerializer()
@@ -0,0 +1,87 @@
+"""
+社交关系模型
+关注关系与私聊消息
+"""
+
+from src.models.user import db
+from datetime import datetime
+
+def conversation_key(user_id: str, partner_id: str) -> str:
+    """会话键：按字典序排列的双方ID，同一对用户的往来消息共用一个键"""
+    low, high = sorted((user_id, partner_id))
+    return f'{low}|{high}'
+
+def _default_conversation_key(context) -> str:
+    """插入消息时按收发双方生成会话键"""
+    params = context.get_current_parameters()
+    return conversation_key(params['sender_id'], params['recipient_id'])
+
+class Follow(db.Model):
+    """关注关系模型"""
+    __tablename__ = 'follows'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    follower_id = db.Column(db.String(64), nullable=False, index=True)
+    followed_id = db.Column(db.String(64), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # 复合唯一索引，防止重复关注；复合索引用于游标分页
+    __table_args__ = (
+        db.UniqueConstraint('follower_id', 'followed_id'),
+        db.Index('ix_follows_followed_created_id', 'followed_id', 'created_at', 'id'),
+        db.Index('ix_follows_follower_created_id', 'follower_id', 'created_at', 'id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'follower_id': self.follower_id,
+            'followed_id': self.followed_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class PrivateMessage(db.Model):
+    """私聊消息模型"""
+    __tablename__ = 'private_messages'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    sender_id = db.Column(db.String(64), nullable=False, index=True)
+    recipient_id = db.Column(db.String(64), nullable=False, index=True)
+    conversation_key = db.Column(db.String(129), default=_default_conversation_key)  # 会话键，见 conversation_key()
+    content = db.Column(db.Text, nullable=False)
+    content_hash = db.Column(db.String(64))  # 区块链上的内容哈希
+    message_type = db.Column(db.String(20), default='text')  # text, image, file
+    is_read = db.Column(db.Boolean, default=False)
+    is_deleted_by_sender = db.Column(db.Boolean, default=False)
+    is_deleted_by_recipient = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    read_at = db.Column(db.DateTime)
+    
+    # 游标分页使用的复合索引
+    __table_args__ = (
+        db.Index('ix_private_messages_pair_created_id', 'sender_id', 'recipient_id', 'created_at', 'id'),
+        db.Index('ix_private_messages_conversation_created_id', 'conversation_key', 'created_at', 'id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'sender_id': self.sender_id,
+            'recipient_id': self.recipient_id,
+            'content': self.content,
+            'content_hash': self.content_hash,
+            'message_type': self.message_type,
+            'is_read': self.is_read,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'read_at': self.read_at.isoformat() if self.read_at else None
+        }
+
+def backfill_conversation_keys() -> int:
+    """为历史消息补写会话键，返回更新的行数"""
+    result = db.session.execute(db.text(
+        "UPDATE private_messages SET conversation_key = CASE WHEN sender_id < recipient_id "
+        "THEN sender_id || '|' || recipient_id ELSE recipient_id || '|' || sender_id END "
+        "WHERE conversation_key IS NULL"
+    ))
+    db.session.commit()
+    return result.rowcount
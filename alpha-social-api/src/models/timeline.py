@@ -0,0 +1,257 @@
+"""
+首页时间线
+发布内容时写扩散到关注者的时间线，粉丝过多的作者改为读取时合并
+"""
+
+import random
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+
+import click
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.sqlite import insert
+
+from src.models.user import db
+from src.models.social import Follow
+from src.models.pagination import Cursor, apply_cursor, encode_cursor
+
+@dataclass
+class TimelineConfig:
+    """时间线配置"""
+    capacity: int = 800  # 每个用户时间线保留的最大条目数
+    celebrity_threshold: int = 5000  # 关注者达到该数量的作者不再写扩散
+    backfill_limit: int = 20  # 新关注时补入时间线的作者近期内容数
+    trim_probability: float = 0.02  # 写入时顺带裁剪该用户时间线的概率
+
+class TimelineEntry(db.Model):
+    """时间线条目模型"""
+    __tablename__ = 'timeline_entries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(64), nullable=False)
+    content_id = db.Column(db.Integer, nullable=False, index=True)
+    author_id = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)  # 内容的发布时间
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'content_id'),
+        db.Index('ix_timeline_entries_user_created_content', 'user_id', 'created_at', 'content_id'),
+        db.Index('ix_timeline_entries_user_author', 'user_id', 'author_id'),
+    )
+
+class HomeTimeline:
+    """首页时间线存储"""
+
+    algorithm = 'following_timeline'
+
+    def __init__(self, config: TimelineConfig = None):
+        self.config = config or TimelineConfig()
+        self.celebrities: Set[str] = set()
+
+    def init_app(self, app):
+        """加载粉丝数超过阈值的作者，首次启动时按已有关注关系和内容生成时间线，并注册重建命令"""
+        self.config.celebrity_threshold = app.config.get('TIMELINE_CELEBRITY_THRESHOLD', self.config.celebrity_threshold)
+
+        with app.app_context():
+            rows = db.session.query(Follow.followed_id).group_by(Follow.followed_id).having(
+                db.func.count(Follow.id) >= self.config.celebrity_threshold
+            ).all()
+            self.celebrities = {row[0] for row in rows}
+
+            from src.models.content import Content
+            if not TimelineEntry.query.first() and Content.query.first():
+                self.rebuild()
+
+        @app.cli.command('timeline-rebuild')
+        def timeline_rebuild():
+            """按关注关系和内容重建全部用户的时间线"""
+            count = self.rebuild()
+            click.echo(f'Rebuilt {count} timeline entries')
+
+    def fan_out(self, content):
+        """将新发布的内容写入作者及其关注者的时间线（不提交事务）"""
+        self.fan_out_many([content])
+
+    def fan_out_many(self, contents: List):
+        """批量写扩散新发布的内容，每位作者只查询一次关注者（不提交事务）"""
+        by_author = {}
+        for content in contents:
+            if content.is_public:
+                by_author.setdefault(content.author_id, []).append(content)
+
+        rows = []
+        for author_id, author_contents in by_author.items():
+            recipients = [author_id]
+            if author_id not in self.celebrities:
+                followers = [
+                    row[0] for row in db.session.query(Follow.follower_id).filter(
+                        Follow.followed_id == author_id
+                    ).limit(self.config.celebrity_threshold).all()
+                ]
+                if len(followers) >= self.config.celebrity_threshold:
+                    # 粉丝过多，改为读取时合并该作者的内容
+                    self.celebrities.add(author_id)
+                else:
+                    recipients.extend(followers)
+
+            rows.extend(
+                {
+                    'user_id': user_id,
+                    'content_id': content.id,
+                    'author_id': author_id,
+                    'created_at': content.created_at
+                }
+                for content in author_contents
+                for user_id in recipients
+            )
+
+        self._insert(rows)
+
+    def on_follow(self, follower_id: str, followed_id: str):
+        """新关注时补入被关注者的近期内容（不提交事务）"""
+        self.on_follow_many(follower_id, [followed_id])
+
+    def on_follow_many(self, follower_id: str, followed_ids: List[str]):
+        """批量关注时一次查询补入各被关注者的近期内容（不提交事务）"""
+        followed_ids = [followed_id for followed_id in followed_ids if followed_id not in self.celebrities]
+        if not followed_ids:
+            return
+
+        from src.models.content import Content
+
+        # 按作者分区编号，每位作者只保留最新的N条
+        row_number = db.func.row_number().over(
+            partition_by=Content.author_id,
+            order_by=(Content.created_at.desc(), Content.id.desc())
+        ).label('row_number')
+        ranked = db.session.query(Content.id, Content.author_id, Content.created_at, row_number).filter(
+            Content.author_id.in_(followed_ids),
+            Content.is_deleted == False,
+            Content.is_public == True
+        ).subquery()
+        contents = db.session.query(ranked.c.id, ranked.c.author_id, ranked.c.created_at).filter(
+            ranked.c.row_number <= self.config.backfill_limit
+        ).all()
+
+        self._insert([
+            {
+                'user_id': follower_id,
+                'content_id': content.id,
+                'author_id': content.author_id,
+                'created_at': content.created_at
+            }
+            for content in contents
+        ])
+
+    def on_unfollow(self, follower_id: str, followed_id: str):
+        """取消关注时移除被关注者的内容（不提交事务）"""
+        self.on_unfollow_many(follower_id, [followed_id])
+
+    def on_unfollow_many(self, follower_id: str, followed_ids: List[str]):
+        """批量取消关注时移除各被关注者的内容（不提交事务）"""
+        if followed_ids:
+            TimelineEntry.query.filter(
+                TimelineEntry.user_id == follower_id,
+                TimelineEntry.author_id.in_(followed_ids)
+            ).delete(synchronize_session=False)
+
+    def remove_content(self, content_id: int):
+        """从所有时间线中移除内容（不提交事务）"""
+        TimelineEntry.query.filter_by(content_id=content_id).delete(synchronize_session=False)
+
+    def read(self, user_id: str, limit: int = 20, offset: int = 0,
+             cursor: Cursor = None) -> Tuple[List, Optional[str]]:
+        """读取用户时间线，返回内容列表及下一页游标"""
+        from src.models.content import Content
+
+        # 传入游标时按游标翻页，否则各来源都取到offset+limit再合并截取
+        window = limit if cursor else offset + limit
+
+        entries = apply_cursor(
+            TimelineEntry.query.with_entities(TimelineEntry.created_at, TimelineEntry.content_id).filter_by(user_id=user_id),
+            TimelineEntry.created_at, TimelineEntry.content_id, cursor
+        ).limit(window).all()
+        items = [(entry.created_at, entry.content_id) for entry in entries]
+
+        # 关注的大V内容在读取时合并
+        celebrities = self._followed_celebrities(user_id)
+        if celebrities:
+            posts = apply_cursor(
+                Content.query.with_entities(Content.created_at, Content.id).filter(
+                    Content.author_id.in_(celebrities),
+                    Content.is_deleted == False,
+                    Content.is_public == True
+                ),
+                Content.created_at, Content.id, cursor
+            ).limit(window).all()
+            items = sorted(set(items) | {(post.created_at, post.id) for post in posts}, reverse=True)
+
+        page = items[:limit] if cursor else items[offset:offset + limit]
+        cursor_token = encode_cursor(*page[-1]) if len(page) == limit else None
+
+        content_ids = [content_id for _, content_id in page]
+        rows = Content.query.filter(
+            Content.id.in_(content_ids),
+            Content.is_deleted == False,
+            Content.is_public == True
+        ).all() if content_ids else []
+        rows_by_id = {content.id: content for content in rows}
+
+        return [rows_by_id[content_id] for content_id in content_ids if content_id in rows_by_id], cursor_token
+
+    def rebuild(self) -> int:
+        """按关注关系和内容重新生成全部时间线，每个用户保留最新的 capacity 条"""
+        TimelineEntry.query.delete()
+        db.session.execute(text(
+            "INSERT INTO timeline_entries (user_id, content_id, author_id, created_at) "
+            "SELECT user_id, id, author_id, created_at FROM ("
+            "SELECT sources.user_id, contents.id, contents.author_id, contents.created_at, "
+            "ROW_NUMBER() OVER (PARTITION BY sources.user_id "
+            "ORDER BY contents.created_at DESC, contents.id DESC) AS row_number FROM ("
+            "SELECT follower_id AS user_id, followed_id AS author_id FROM follows "
+            "WHERE followed_id NOT IN :celebrities "
+            "UNION "
+            "SELECT DISTINCT author_id, author_id FROM contents"
+            ") AS sources JOIN contents ON contents.author_id = sources.author_id "
+            "WHERE contents.is_deleted = 0 AND contents.is_public = 1"
+            ") WHERE row_number <= :capacity"
+        ).bindparams(bindparam('celebrities', expanding=True)), {
+            'celebrities': sorted(self.celebrities),
+            'capacity': self.config.capacity
+        })
+        db.session.commit()
+        return TimelineEntry.query.count()
+
+    def _followed_celebrities(self, user_id: str) -> List[str]:
+        """获取用户关注的大V"""
+        if not self.celebrities:
+            return []
+        return [
+            row[0] for row in db.session.query(Follow.followed_id).filter(
+                Follow.follower_id == user_id,
+                Follow.followed_id.in_(self.celebrities)
+            ).all()
+        ]
+
+    def _insert(self, rows: List[dict]):
+        """批量写入时间线条目，重复条目忽略，并抽样裁剪超出容量的时间线"""
+        if not rows:
+            return
+
+        db.session.execute(insert(TimelineEntry).on_conflict_do_nothing(), rows)
+
+        trim_users = [row['user_id'] for row in rows if random.random() < self.config.trim_probability]
+        if trim_users:
+            self._trim(trim_users)
+
+    def _trim(self, user_ids: List[str]):
+        """删除超出容量的最早条目"""
+        db.session.execute(
+            text("DELETE FROM timeline_entries WHERE user_id = :user_id AND id NOT IN ("
+                 "SELECT id FROM timeline_entries WHERE user_id = :user_id "
+                 "ORDER BY created_at DESC, content_id DESC LIMIT :capacity)"),
+            [{'user_id': user_id, 'capacity': self.config.capacity} for user_id in set(user_ids)]
+        )
+
+# 全局首页时间线实例
+home_timeline = HomeTimeline()
@@ -0,0 +1,206 @@
+"""
+热门内容计算
+按时间窗口维护随时间衰减的互动得分，后台定时刷新各窗口的热门榜单
+"""
+
+import heapq
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+@dataclass
+class TrendingWindow:
+    """热门时间窗口"""
+    name: str
+    max_age: float  # 内容发布时间超过该值（秒）后不再参与排行
+    half_life: float  # 互动得分的半衰期（秒）
+
+@dataclass
+class TrendingConfig:
+    """热门计算配置"""
+    windows: Tuple[TrendingWindow, ...] = (
+        TrendingWindow('24h', 24 * 3600, 6 * 3600),
+        TrendingWindow('7d', 7 * 24 * 3600, 36 * 3600),
+        TrendingWindow('30d', 30 * 24 * 3600, 5 * 24 * 3600),
+    )
+    weights: Dict[str, float] = field(default_factory=lambda: {
+        'view': 0.1,
+        'like': 1.0,
+        'comment': 3.0,
+        'share': 5.0
+    })
+    top_k: int = 100  # 每个窗口预先计算的榜单长度
+    refresh_interval: float = 30.0  # 榜单刷新间隔（秒）
+
+class TrendingEngine:
+    """热门内容计算引擎
+
+    得分采用前向衰减：互动发生在 t 时累加 weight * 2^((t - epoch) / half_life)，
+    同一窗口内各内容的衰减系数相同，因此无需随时间重算已有得分即可直接比较大小。
+    """
+
+    algorithm = 'decayed_engagement'
+    # 窗口内有互动的内容不足时，以窗口内最新发布的内容补足
+    fill_algorithm = 'recent'
+
+    # 指数超过该值时平移基准时间，避免得分溢出
+    max_exponent = 64
+
+    def __init__(self, config: TrendingConfig = None):
+        self.config = config or TrendingConfig()
+        self.windows = {window.name: window for window in self.config.windows}
+        self._lock = threading.Lock()
+        self._epoch = time.time()
+        self._created: Dict[int, float] = {}
+        self._scores: Dict[str, Dict[int, float]] = {name: {} for name in self.windows}
+        self._top: Dict[str, List[int]] = {}
+        self._recent: Dict[str, List[int]] = {}
+        self._refreshed_at: Optional[float] = None
+        self._stopped = threading.Event()
+        self._thread = None
+        self._app = None
+
+    def init_app(self, app):
+        """加载近期内容的互动数据并启动后台刷新线程"""
+        self._app = app
+        self.config.refresh_interval = app.config.get('TRENDING_REFRESH_INTERVAL', self.config.refresh_interval)
+
+        with app.app_context():
+            self.warm_up()
+        self.refresh()
+
+        self._thread = threading.Thread(target=self._run, name='trending-refresh', daemon=True)
+        self._thread.start()
+
+    def warm_up(self):
+        """从数据库加载窗口内的公开内容，以现有统计值作为初始得分"""
+        from src.models.content import Content
+
+        max_age = max(window.max_age for window in self.windows.values())
+        since = datetime.utcnow() - timedelta(seconds=max_age)
+
+        rows = Content.query.with_entities(
+            Content.id, Content.created_at, Content.view_count,
+            Content.like_count, Content.comment_count, Content.share_count
+        ).filter(
+            Content.is_deleted == False,
+            Content.is_public == True,
+            Content.created_at >= since
+        ).all()
+
+        for row in rows:
+            created = self._timestamp(row.created_at)
+            self.register(row.id, row.created_at)
+            for kind, count in (('view', row.view_count), ('like', row.like_count),
+                                ('comment', row.comment_count), ('share', row.share_count)):
+                if count:
+                    self.record(row.id, kind, count, at=created)
+
+    def register(self, content_id: int, created_at: datetime = None):
+        """登记新发布的公开内容"""
+        created = self._timestamp(created_at) if created_at else time.time()
+        with self._lock:
+            self._created[content_id] = created
+            for scores in self._scores.values():
+                scores.setdefault(content_id, 0.0)
+
+    def remove(self, content_id: int):
+        """移除已删除或转为私密的内容"""
+        with self._lock:
+            self._created.pop(content_id, None)
+            for scores in self._scores.values():
+                scores.pop(content_id, None)
+            for ranking in (self._top, self._recent):
+                for name, top in ranking.items():
+                    if content_id in top:
+                        ranking[name] = [item for item in top if item != content_id]
+
+    def record(self, content_id: int, kind: str, delta: int = 1, at: float = None):
+        """记录一次互动，kind 为 view、like、comment 或 share"""
+        weight = self.config.weights.get(kind)
+        if not weight:
+            return
+
+        at = at or time.time()
+        with self._lock:
+            if content_id not in self._created:
+                # 未登记的内容已超出所有窗口或不是公开内容
+                return
+            for name, window in self.windows.items():
+                self._scores[name][content_id] += weight * delta * 2 ** ((at - self._epoch) / window.half_life)
+
+    def refresh(self):
+        """重新计算各窗口的热门榜单"""
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            self._rebase(now)
+
+            for name, window in self.windows.items():
+                since = now - window.max_age
+                scores = self._scores[name]
+                in_window = [content_id for content_id, created in self._created.items() if created >= since]
+                candidates = [content_id for content_id in in_window if scores[content_id] > 0]
+                self._top[name] = heapq.nlargest(self.config.top_k, candidates, key=scores.__getitem__)
+                self._recent[name] = heapq.nlargest(self.config.top_k, in_window, key=self._created.__getitem__)
+
+            self._refreshed_at = now
+
+    def top(self, window: str, limit: int = 20) -> List[int]:
+        """获取窗口内的热门内容ID"""
+        with self._lock:
+            return list(self._top.get(window, [])[:limit])
+
+    def recent(self, window: str, limit: int = 20) -> List[int]:
+        """获取窗口内最新发布的内容ID，用于补足热门榜单"""
+        with self._lock:
+            return list(self._recent.get(window, [])[:limit])
+
+    @property
+    def refreshed_at(self) -> Optional[datetime]:
+        """榜单最近一次刷新时间"""
+        return datetime.utcfromtimestamp(self._refreshed_at) if self._refreshed_at else None
+
+    def shutdown(self):
+        """停止后台刷新线程"""
+        self._stopped.set()
+
+    def _prune(self, now: float):
+        """清除超出最大窗口的内容"""
+        max_age = max(window.max_age for window in self.windows.values())
+        expired = [content_id for content_id, created in self._created.items() if created < now - max_age]
+        for content_id in expired:
+            del self._created[content_id]
+            for scores in self._scores.values():
+                scores.pop(content_id, None)
+
+    def _rebase(self, now: float):
+        """平移衰减基准时间，等比例缩小已有得分"""
+        shortest = min(window.half_life for window in self.windows.values())
+        if (now - self._epoch) / shortest < self.max_exponent:
+            return
+
+        for name, window in self.windows.items():
+            factor = 2 ** (-(now - self._epoch) / window.half_life)
+            scores = self._scores[name]
+            for content_id in scores:
+                scores[content_id] *= factor
+        self._epoch = now
+
+    @staticmethod
+    def _timestamp(value: datetime) -> float:
+        """将数据库中的UTC时间转换为时间戳"""
+        return (value - datetime(1970, 1, 1)).total_seconds()
+
+    def _run(self):
+        """后台刷新循环"""
+        while not self._stopped.wait(self.config.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                self._app.logger.warning(f"Trending refresh failed: {e}")
+
+# 全局热门计算实例
+trending_engine = TrendingEngine()
@@ -0,0 +1,126 @@
+"""
+用户社交计数
+关注数、粉丝数及私信收发、未读数，随社交写操作在同一事务中增量更新
+"""
+
+from typing import Dict, List
+
+import click
+from sqlalchemy.dialects.sqlite import insert
+
+from src.models.user import db
+
+class UserStats(db.Model):
+    """用户社交计数模型"""
+    __tablename__ = 'user_stats'
+
+    user_id = db.Column(db.String(64), primary_key=True)
+    followers_count = db.Column(db.Integer, nullable=False, default=0)
+    following_count = db.Column(db.Integer, nullable=False, default=0)
+    sent_messages = db.Column(db.Integer, nullable=False, default=0)
+    received_messages = db.Column(db.Integer, nullable=False, default=0)
+    unread_messages = db.Column(db.Integer, nullable=False, default=0)
+
+class UserStatsCounters:
+    """用户社交计数器"""
+
+    fields = ('followers_count', 'following_count', 'sent_messages', 'received_messages', 'unread_messages')
+
+    def init_app(self, app):
+        """首次启动时按实际数据初始化计数，并注册重建命令"""
+        with app.app_context():
+            if not UserStats.query.first():
+                self.rebuild()
+
+        @app.cli.command('user-stats-rebuild')
+        def user_stats_rebuild():
+            """按实际数据重建用户社交计数"""
+            count = self.rebuild()
+            click.echo(f'Rebuilt social stats for {count} users')
+
+    def increment(self, changes: Dict[str, Dict[str, int]]):
+        """按 {用户ID: {字段: 增量}} 更新计数（不提交事务）"""
+        rows = [
+            {'user_id': user_id, **{field: deltas.get(field, 0) for field in self.fields}}
+            for user_id, deltas in changes.items()
+        ]
+        if not rows:
+            return
+
+        statement = insert(UserStats)
+        db.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=['user_id'],
+                set_={field: getattr(UserStats, field) + getattr(statement.excluded, field) for field in self.fields}
+            ),
+            rows
+        )
+
+    def on_follow(self, follower_id: str, followed_id: str, delta: int = 1):
+        """关注或取消关注（不提交事务）"""
+        self.on_follow_many(follower_id, [followed_id], delta)
+
+    def on_follow_many(self, follower_id: str, followed_ids: List[str], delta: int = 1):
+        """批量关注或取消关注（不提交事务）"""
+        if not followed_ids:
+            return
+        changes = {followed_id: {'followers_count': delta} for followed_id in followed_ids}
+        changes[follower_id] = {'following_count': delta * len(followed_ids)}
+        self.increment(changes)
+
+    def on_message_sent(self, sender_id: str, recipient_id: str):
+        """发送私信（不提交事务）"""
+        self.increment({
+            sender_id: {'sent_messages': 1},
+            recipient_id: {'received_messages': 1, 'unread_messages': 1}
+        })
+
+    def on_messages_read(self, user_id: str, count: int = 1):
+        """未读私信被标记已读或被接收方删除（不提交事务）"""
+        if count:
+            self.increment({user_id: {'unread_messages': -count}})
+
+    def get(self, user_id: str) -> Dict[str, int]:
+        """获取用户的社交计数"""
+        stats = db.session.get(UserStats, user_id)
+        return {field: getattr(stats, field) if stats else 0 for field in self.fields}
+
+    def rebuild(self) -> int:
+        """按实际数据重新计算全部用户的计数"""
+        from src.models.social import Follow, PrivateMessage
+
+        # 先执行写操作取得写锁，计数期间其他写入会等待，避免重建覆盖并发的增量
+        UserStats.query.delete()
+
+        queries = {
+            'followers_count': db.session.query(Follow.followed_id, db.func.count(Follow.id)).group_by(Follow.followed_id),
+            'following_count': db.session.query(Follow.follower_id, db.func.count(Follow.id)).group_by(Follow.follower_id),
+            'sent_messages': db.session.query(
+                PrivateMessage.sender_id, db.func.count(PrivateMessage.id)
+            ).group_by(PrivateMessage.sender_id),
+            'received_messages': db.session.query(
+                PrivateMessage.recipient_id, db.func.count(PrivateMessage.id)
+            ).group_by(PrivateMessage.recipient_id),
+            'unread_messages': db.session.query(
+                PrivateMessage.recipient_id, db.func.count(PrivateMessage.id)
+            ).filter(
+                PrivateMessage.is_read == False,
+                PrivateMessage.is_deleted_by_recipient == False
+            ).group_by(PrivateMessage.recipient_id)
+        }
+
+        values: Dict[str, Dict[str, int]] = {}
+        for field, query in queries.items():
+            for user_id, count in query.all():
+                values.setdefault(user_id, {})[field] = count
+
+        if values:
+            db.session.execute(insert(UserStats), [
+                {'user_id': user_id, **{field: counts.get(field, 0) for field in self.fields}}
+                for user_id, counts in values.items()
+            ])
+        db.session.commit()
+        return len(values)
+
+# 全局用户社交计数器实例
+user_stats = UserStatsCounters()
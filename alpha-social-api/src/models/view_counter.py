@@ -0,0 +1,186 @@
+"""
+浏览计数写回缓冲
+在进程内按内容聚合浏览次数，定时或达到阈值时批量写回数据库；
+每次写回递增内容行的 view_flushes，读取方按行中的写回次数判断哪些增量尚未包含在读到的数据中
+"""
+
+import atexit
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, func
+
+from src.models.content import Content, db
+from src.models.cache import content_cache
+
+@dataclass
+class ViewCounterConfig:
+    """浏览计数缓冲配置"""
+    flush_interval: float = 5.0  # 定时写回间隔（秒）
+    flush_threshold: int = 1000  # 缓冲的浏览增量达到该值时提前写回
+    retain_flushed: float = 60.0  # 已提交的写回保留的时间（秒），不短于内容缓存的有效期
+    version_batch: int = 500  # 读取写回后的 view_flushes 时每批查询的内容数
+
+class _Flush:
+    """一次写回中单个内容的增量"""
+    __slots__ = ('delta', 'version', 'committed_at')
+
+    def __init__(self, delta: int):
+        self.delta = delta
+        self.version: Optional[int] = None  # 写回后行中的 view_flushes，写入前为None
+        self.committed_at: Optional[float] = None
+
+class ViewCounter:
+    """浏览计数写回缓冲"""
+
+    def __init__(self, config: ViewCounterConfig = None):
+        self.config = config or ViewCounterConfig()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[int, int] = {}
+        self._flushed: Dict[int, List[_Flush]] = {}
+        self._pending_total = 0
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._app = None
+
+    def init_app(self, app):
+        """绑定应用并启动后台写回线程"""
+        self._app = app
+        self.config.flush_interval = app.config.get('VIEW_FLUSH_INTERVAL', self.config.flush_interval)
+        self.config.flush_threshold = app.config.get('VIEW_FLUSH_THRESHOLD', self.config.flush_threshold)
+
+        self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def record(self, content_id: int, increment: int = 1):
+        """记录一次浏览"""
+        with self._lock:
+            self._pending[content_id] = self._pending.get(content_id, 0) + increment
+            self._pending_total += increment
+            should_flush = self._pending_total >= self.config.flush_threshold
+
+        if should_flush:
+            self._wakeup.set()
+
+    def pending(self, content_id: int, view_flushes: Optional[int]) -> int:
+        """获取读到的内容行中尚未包含的浏览增量，view_flushes 为读到的行中的写回次数"""
+        view_flushes = view_flushes or 0
+        with self._lock:
+            delta = self._pending.get(content_id, 0)
+            for flush in self._flushed.get(content_id, ()):
+                if flush.version is None or flush.version > view_flushes:
+                    delta += flush.delta
+            return delta
+
+    def apply(self, content_dict: Dict, view_flushes: Optional[int]) -> Dict:
+        """将读到的内容行中尚未包含的浏览增量合并到序列化后的内容中"""
+        delta = self.pending(content_dict['id'], view_flushes)
+        if delta:
+            content_dict['view_count'] = (content_dict['view_count'] or 0) + delta
+        return content_dict
+
+    def flush(self) -> List[int]:
+        """将缓冲的浏览增量批量写回数据库，返回写回的内容ID列表"""
+        with self._flush_lock:
+            with self._lock:
+                self._prune()
+                if not self._pending:
+                    return []
+                batch = {content_id: _Flush(delta) for content_id, delta in self._pending.items()}
+                for content_id, flush in batch.items():
+                    self._flushed.setdefault(content_id, []).append(flush)
+                self._pending = {}
+                self._pending_total = 0
+
+            contents = Content.__table__
+            statement = contents.update().where(
+                contents.c.id == bindparam('content_id')
+            ).values(
+                view_count=func.coalesce(contents.c.view_count, 0) + bindparam('delta'),
+                view_flushes=func.coalesce(contents.c.view_flushes, 0) + 1
+            )
+
+            try:
+                db.session.execute(statement, [
+                    {'content_id': content_id, 'delta': flush.delta}
+                    for content_id, flush in batch.items()
+                ])
+                # 在同一写事务中读取写回后的次数，提交前其他写入方无法修改这些行
+                content_ids = list(batch)
+                versions = {}
+                for start in range(0, len(content_ids), self.config.version_batch):
+                    versions.update(db.session.execute(
+                        db.select(contents.c.id, contents.c.view_flushes).where(
+                            contents.c.id.in_(content_ids[start:start + self.config.version_batch])
+                        )
+                    ).all())
+                with self._lock:
+                    for content_id, version in versions.items():
+                        batch[content_id].version = version
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                # 写回失败，将增量放回缓冲等待下次写回
+                with self._lock:
+                    for content_id, flush in batch.items():
+                        self._flushed[content_id].remove(flush)
+                        if not self._flushed[content_id]:
+                            del self._flushed[content_id]
+                        self._pending[content_id] = self._pending.get(content_id, 0) + flush.delta
+                        self._pending_total += flush.delta
+                raise
+
+            committed_at = time.monotonic()
+            with self._lock:
+                for flush in batch.values():
+                    flush.committed_at = committed_at
+
+            content_cache.invalidate(*batch)
+            return list(batch)
+
+    def _prune(self):
+        """移除提交已超过保留时间的写回（调用方持有锁）"""
+        expired_before = time.monotonic() - self.config.retain_flushed
+        for content_id in list(self._flushed):
+            flushes = [
+                flush for flush in self._flushed[content_id]
+                if flush.committed_at is None or flush.committed_at > expired_before
+            ]
+            if flushes:
+                self._flushed[content_id] = flushes
+            else:
+                del self._flushed[content_id]
+
+    def shutdown(self):
+        """停止后台线程并写回剩余的浏览增量"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.config.flush_interval)
+        if self._app is not None:
+            with self._app.app_context():
+                self.flush()
+
+    def _run(self):
+        """后台写回循环"""
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.config.flush_interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+
+            try:
+                with self._app.app_context():
+                    self.flush()
+            except Exception as e:
+                self._app.logger.warning(f"View count flush failed: {e}")
+
+# 全局浏览计数缓冲实例
+view_counter = ViewCounter()
@@ -5,12 +5,42 @@
 
 from flask import Blueprint, request, jsonify
 from src.models.content import ContentManager, db
-from src.models.blockchain import blockchain_client
+from src.models.view_counter import view_counter
+from src.models.trending import trending_engine
+from src.models.timeline import home_timeline
+from src.models.counters import stat_counters
+from src.models.serialization import content_serializer
+from src.models.cache import content_cache
+from src.models.membership import membership_index
+from src.models.pagination import decode_cursor, next_cursor
 import json
-from datetime import datetime
 
 content_bp = Blueprint('content', __name__)
 
+# 批量创建内容的单次请求上限
+MAX_BATCH_SIZE = 500
+
+# 批量查询点赞状态的单次请求上限
+MAX_LIKE_STATUS_IDS = 500
+
+def _pending_views(content):
+    """列表序列化时合并尚未写回的浏览次数"""
+    return {'view_count': (content.view_count or 0) + view_counter.pending(content.id, content.view_flushes)}
+
+def _list_extra(contents, user_id=None):
+    """列表序列化的附加字段，传入user_id时一次查询整页的点赞状态并附带 is_liked"""
+    if not user_id:
+        return _pending_views
+    
+    liked_ids = ContentManager.get_liked_ids(user_id, 'content', [content.id for content in contents])
+    
+    def extra(content):
+        fields = _pending_views(content)
+        fields['is_liked'] = content.id in liked_ids
+        return fields
+    
+    return extra
+
 @content_bp.route('/contents', methods=['POST'])
 def create_content():
     """创建内容"""
@@ -23,8 +53,8 @@ def create_content():
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        # 创建内容
-        content = ContentManager.create_content(
+        # 创建内容，同时写入上链交易（由发件箱后台提交）
+        content, transaction = ContentManager.create_content(
             author_id=data['author_id'],
             content_type=data['content_type'],
             title=data.get('title'),
@@ -34,14 +64,8 @@ def create_content():
             is_public=data.get('is_public', True)
         )
         
-        # 将内容发布到区块链
-        blockchain_result = blockchain_client.create_post(
-            account_id=data['author_id'],
-            content_hash=content.content_hash
-        )
-        
         response_data = content.to_dict()
-        response_data['blockchain_tx'] = blockchain_result.tx_hash if blockchain_result.success else None
+        response_data['blockchain_tx'] = transaction
         
         return jsonify({
             'success': True,
@@ -51,20 +75,85 @@ def create_content():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@content_bp.route('/contents/batch', methods=['POST'])
+def create_contents_batch():
+    """批量创建内容"""
+    try:
+        data = request.get_json()
+        items = data.get('items') if isinstance(data, dict) else None
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Missing items'}), 400
+        
+        if len(items) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Too many items, maximum is {MAX_BATCH_SIZE}'}), 400
+        
+        # 逐项校验，不合法的条目单独返回错误
+        results = [None] * len(items)
+        valid_indexes = []
+        required_fields = ['author_id', 'content_type', 'content_data']
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = {'index': index, 'success': False, 'error': 'Item must be an object'}
+                continue
+            
+            missing = [field for field in required_fields if field not in item]
+            if missing:
+                results[index] = {'index': index, 'success': False, 'error': f'Missing required field: {missing[0]}'}
+            elif 'tags' in item and not isinstance(item['tags'], list):
+                results[index] = {'index': index, 'success': False, 'error': 'tags must be a list'}
+            else:
+                valid_indexes.append(index)
+        
+        if not valid_indexes:
+            return jsonify({
+                'success': False,
+                'error': 'No valid items',
+                'data': results
+            }), 400
+        
+        # 所有合法条目在同一事务中批量插入，内容哈希打包为一笔链上交易（由发件箱后台提交）
+        contents, blockchain_tx = ContentManager.create_contents([items[index] for index in valid_indexes])
+        
+        for index, content in zip(valid_indexes, contents):
+            results[index] = {
+                'index': index,
+                'success': True,
+                'data': {
+                    'id': content.id,
+                    'content_hash': content.content_hash,
+                    'blockchain_tx': blockchain_tx
+                }
+            }
+        
+        return jsonify({
+            'success': True,
+            'data': results,
+            'summary': {
+                'total': len(items),
+                'created': len(contents),
+                'failed': len(items) - len(contents)
+            }
+        }), 201
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @content_bp.route('/contents/<int:content_id>', methods=['GET'])
 def get_content(content_id):
     """获取单个内容"""
     try:
-        content = ContentManager.get_content(content_id)
-        if not content:
+        data, view_flushes = ContentManager.get_content_data(content_id)
+        if not data:
             return jsonify({'error': 'Content not found'}), 404
         
-        # 增加浏览次数
-        ContentManager.update_content_stats(content_id, 'view')
+        # 增加浏览次数（写回缓冲，定时批量落库）
+        view_counter.record(content_id)
+        trending_engine.record(content_id, 'view')
         
         return jsonify({
             'success': True,
-            'data': content.to_dict()
+            'data': view_counter.apply(data, view_flushes)
         })
         
     except Exception as e:
@@ -80,21 +169,59 @@ def get_contents():
         author_id = request.args.get('author_id')
         keyword = request.args.get('search')
         
+        try:
+            cursor = decode_cursor(request.args.get('cursor'))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
         if author_id:
-            contents = ContentManager.get_user_contents(author_id, limit, offset)
+            contents = ContentManager.get_user_contents(author_id, limit, offset, cursor)
         elif keyword:
+            # 检索结果按相关度排序，只支持offset分页
             contents = ContentManager.search_contents(keyword, limit, offset)
         else:
-            contents = ContentManager.get_public_contents(limit, offset, content_type)
+            contents = ContentManager.get_public_contents(limit, offset, content_type, cursor)
         
-        return jsonify({
-            'success': True,
-            'data': [content.to_dict() for content in contents],
-            'pagination': {
+        return content_serializer.list_response(
+            contents,
+            extra=_list_extra(contents, request.args.get('user_id')),
+            success=True,
+            pagination={
                 'limit': limit,
                 'offset': offset,
-                'has_more': len(contents) == limit
+                'has_more': len(contents) == limit,
+                'next_cursor': None if keyword and not author_id else next_cursor(contents, limit)
             }
+        )
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@content_bp.route('/contents/<int:content_id>', methods=['PUT'])
+def update_content(content_id):
+    """编辑内容"""
+    try:
+        data = request.get_json()
+        author_id = data.get('author_id')
+        
+        if not author_id:
+            return jsonify({'error': 'Missing author_id'}), 400
+        
+        content = ContentManager.update_content(
+            content_id=content_id,
+            author_id=author_id,
+            title=data.get('title'),
+            description=data.get('description'),
+            content_data=data.get('content_data'),
+            tags=data.get('tags'),
+            is_public=data.get('is_public')
+        )
+        if not content:
+            return jsonify({'error': 'Content not found or unauthorized'}), 404
+        
+        return jsonify({
+            'success': True,
+            'data': view_counter.apply(content.to_dict(), content.view_flushes)
         })
         
     except Exception as e:
@@ -152,17 +279,22 @@ def get_comments(content_id):
         limit = min(int(request.args.get('limit', 20)), 100)
         offset = int(request.args.get('offset', 0))
         
-        comments = ContentManager.get_comments(content_id, limit, offset)
+        try:
+            cursor = decode_cursor(request.args.get('cursor'))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        comments = ContentManager.get_comments(content_id, limit, offset, cursor)
+        
+        # 一次性获取本页所有评论的回复
+        replies = ContentManager.get_comment_replies_bulk(
+            [comment.id for comment in comments if comment.reply_count > 0]
+        )
         
-        # 为每个评论获取回复
         comments_data = []
         for comment in comments:
             comment_dict = comment.to_dict()
-            if comment.reply_count > 0:
-                replies = ContentManager.get_comment_replies(comment.id)
-                comment_dict['replies'] = [reply.to_dict() for reply in replies]
-            else:
-                comment_dict['replies'] = []
+            comment_dict['replies'] = [reply.to_dict() for reply in replies.get(comment.id, [])]
             comments_data.append(comment_dict)
         
         return jsonify({
@@ -171,7 +303,8 @@ def get_comments(content_id):
             'pagination': {
                 'limit': limit,
                 'offset': offset,
-                'has_more': len(comments) == limit
+                'has_more': len(comments) == limit,
+                'next_cursor': next_cursor(comments, limit)
             }
         })
         
@@ -188,17 +321,14 @@ def toggle_content_like(content_id):
         if not user_id:
             return jsonify({'error': 'Missing user_id'}), 400
         
-        is_liked = ContentManager.toggle_like(user_id, 'content', content_id)
-        
-        # 发送到区块链
-        if is_liked:
-            blockchain_result = blockchain_client.like_post(user_id, content_id)
+        # 点赞时同时写入上链交易（由发件箱后台提交）
+        is_liked, transaction = ContentManager.toggle_like(user_id, 'content', content_id)
         
         return jsonify({
             'success': True,
             'data': {
                 'is_liked': is_liked,
-                'blockchain_tx': blockchain_result.tx_hash if is_liked and blockchain_result.success else None
+                'blockchain_tx': transaction
             }
         })
         
@@ -215,7 +345,7 @@ def toggle_comment_like(comment_id):
         if not user_id:
             return jsonify({'error': 'Missing user_id'}), 400
         
-        is_liked = ContentManager.toggle_like(user_id, 'comment', comment_id)
+        is_liked, _ = ContentManager.toggle_like(user_id, 'comment', comment_id)
         
         return jsonify({
             'success': True,
@@ -269,6 +399,40 @@ def get_like_status(content_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@content_bp.route('/like-status/bulk', methods=['POST'])
+def get_like_status_bulk():
+    """批量获取点赞状态"""
+    try:
+        data = request.get_json()
+        user_id = data.get('user_id')
+        target_type = data.get('target_type', 'content')
+        target_ids = data.get('target_ids')
+        
+        if not user_id:
+            return jsonify({'error': 'Missing user_id'}), 400
+        
+        if target_type not in ('content', 'comment'):
+            return jsonify({'error': f'Invalid target_type: {target_type}'}), 400
+        
+        # bool 是 int 的子类，JSON 中的 true/false 需单独排除
+        if not isinstance(target_ids, list) or not all(
+            isinstance(target_id, int) and not isinstance(target_id, bool) for target_id in target_ids
+        ):
+            return jsonify({'error': 'target_ids must be a list of integers'}), 400
+        
+        if len(target_ids) > MAX_LIKE_STATUS_IDS:
+            return jsonify({'error': f'Too many target_ids, maximum is {MAX_LIKE_STATUS_IDS}'}), 400
+        
+        liked_ids = ContentManager.get_liked_ids(user_id, target_type, target_ids)
+        
+        return jsonify({
+            'success': True,
+            'data': {str(target_id): target_id in liked_ids for target_id in target_ids}
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @content_bp.route('/trending', methods=['GET'])
 def get_trending_contents():
     """获取热门内容"""
@@ -276,26 +440,47 @@ def get_trending_contents():
         limit = min(int(request.args.get('limit', 20)), 100)
         time_range = request.args.get('range', '24h')  # 24h, 7d, 30d
         
-        # 这里应该根据时间范围和互动数据计算热门内容
-        # 为了演示，我们返回按点赞数排序的内容
+        if time_range not in trending_engine.windows:
+            return jsonify({'error': f'Invalid range: {time_range}'}), 400
+        
         from src.models.content import Content
         
-        contents = Content.query.filter_by(
-            is_deleted=False,
-            is_public=True
-        ).order_by(
-            Content.like_count.desc(),
-            Content.created_at.desc()
-        ).limit(limit).all()
+        # 从内存中的热门榜单取ID，窗口内有互动的内容不足时以窗口内最新发布的内容补足
+        content_ids = trending_engine.top(time_range, limit)
+        ranked_ids = set(content_ids)
+        if len(content_ids) < limit:
+            content_ids += [
+                content_id for content_id in trending_engine.recent(time_range, limit)
+                if content_id not in ranked_ids
+            ][:limit - len(content_ids)]
+        
+        rows = Content.query.filter(
+            Content.id.in_(content_ids),
+            Content.is_deleted == False,
+            Content.is_public == True
+        ).all() if content_ids else []
+        rows_by_id = {content.id: content for content in rows}
+        contents = [rows_by_id[content_id] for content_id in content_ids if content_id in rows_by_id]
+        
+        filled = sum(1 for content in contents if content.id not in ranked_ids)
+        if not filled:
+            algorithm = trending_engine.algorithm
+        elif filled == len(contents):
+            algorithm = trending_engine.fill_algorithm
+        else:
+            algorithm = f'{trending_engine.algorithm}+{trending_engine.fill_algorithm}'
         
-        return jsonify({
-            'success': True,
-            'data': [content.to_dict() for content in contents],
-            'meta': {
+        return content_serializer.list_response(
+            contents,
+            extra=_list_extra(contents, request.args.get('user_id')),
+            success=True,
+            meta={
                 'time_range': time_range,
-                'algorithm': 'like_count_desc'
+                'algorithm': algorithm,
+                'filled': filled,
+                'refreshed_at': trending_engine.refreshed_at.isoformat() if trending_engine.refreshed_at else None
             }
-        })
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -311,23 +496,41 @@ def get_user_feed():
         if not user_id:
             return jsonify({'error': 'Missing user_id parameter'}), 400
         
-        # 这里应该根据用户的关注列表、兴趣标签等生成个性化推荐
-        # 为了演示，我们返回最新的公开内容
-        contents = ContentManager.get_public_contents(limit, offset)
-        
-        return jsonify({
-            'success': True,
-            'data': [content.to_dict() for content in contents],
-            'pagination': {
+        try:
+            cursor = decode_cursor(request.args.get('cursor'))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        # 从关注时间线读取
+        contents, cursor_token = home_timeline.read(user_id, limit, offset, cursor)
+        algorithm = home_timeline.algorithm
+        personalized = True
+        
+        if not contents and not cursor and offset == 0:
+            from src.models.social import Follow
+            
+            # 尚未关注任何人时退回最新的公开内容
+            if not Follow.query.filter_by(follower_id=user_id).first():
+                contents = ContentManager.get_public_contents(limit, offset)
+                cursor_token = next_cursor(contents, limit)
+                algorithm = 'latest_public'
+                personalized = False
+        
+        return content_serializer.list_response(
+            contents,
+            extra=_list_extra(contents, user_id),
+            success=True,
+            pagination={
                 'limit': limit,
                 'offset': offset,
-                'has_more': len(contents) == limit
+                'has_more': cursor_token is not None,
+                'next_cursor': cursor_token
             },
-            'meta': {
-                'algorithm': 'latest_public',
-                'personalized': False
+            meta={
+                'algorithm': algorithm,
+                'personalized': personalized
             }
-        })
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -336,31 +539,35 @@ def get_user_feed():
 def get_content_stats():
     """获取内容统计信息"""
     try:
-        from src.models.content import Content, Comment, Like, Share
-        
-        total_contents = Content.query.filter_by(is_deleted=False).count()
-        total_comments = Comment.query.filter_by(is_deleted=False).count()
-        total_likes = Like.query.count()
-        total_shares = Share.query.count()
-        
-        # 今日新增内容
-        today = datetime.utcnow().date()
-        today_contents = Content.query.filter(
-            Content.created_at >= today,
-            Content.is_deleted == False
-        ).count()
+        # 计数随写操作增量维护，这里只读取计数表
+        return jsonify({
+            'success': True,
+            'data': stat_counters.snapshot()
+        })
         
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@content_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """获取内容缓存统计信息"""
+    try:
         return jsonify({
             'success': True,
-            'data': {
-                'total_contents': total_contents,
-                'total_comments': total_comments,
-                'total_likes': total_likes,
-                'total_shares': total_shares,
-                'today_contents': today_contents
-            }
+            'data': content_cache.stats()
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@content_bp.route('/membership/stats', methods=['GET'])
+def get_membership_stats():
+    """获取点赞、关注关系索引的规模及内存占用"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': membership_index.stats()
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,96 @@
+"""
+实时事件API路由
+提供SSE事件流及长轮询接口，替代客户端定时轮询会话列表和社交统计
+"""
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from src.models.events import event_bus, TooManyConnections
+import json
+
+events_bp = Blueprint('events', __name__)
+
+def _event_id(value):
+    """解析客户端传入的事件ID，无效时返回None"""
+    try:
+        return int(value) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+@events_bp.route('/events/<user_id>/stream', methods=['GET'])
+def stream_events(user_id):
+    """SSE事件流"""
+    try:
+        last_event_id = _event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+        
+        try:
+            subscription = event_bus.subscribe(user_id, last_event_id)
+        except TooManyConnections as e:
+            return jsonify({'error': str(e)}), 503
+        
+        heartbeat = event_bus.config.heartbeat_interval
+        
+        def generate():
+            try:
+                yield 'retry: 3000\n\n'
+                while not subscription.closed:
+                    events = subscription.get(heartbeat)
+                    if not events:
+                        yield ': keep-alive\n\n'
+                        continue
+                    for event in events:
+                        event_id = f"id: {event['id']}\n" if event['id'] is not None else ''
+                        yield f"{event_id}event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            finally:
+                subscription.close()
+        
+        return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@events_bp.route('/events/<user_id>/poll', methods=['GET'])
+def poll_events(user_id):
+    """长轮询：返回 since 之后的事件，暂无事件时等待新事件或超时"""
+    try:
+        since = _event_id(request.args.get('since'))
+        timeout = min(float(request.args.get('timeout', event_bus.config.long_poll_timeout)),
+                      event_bus.config.long_poll_timeout)
+        
+        try:
+            subscription = event_bus.subscribe(user_id, since)
+        except TooManyConnections as e:
+            return jsonify({'error': str(e)}), 503
+        
+        try:
+            # 首次轮询未带 since 时不等待，只返回当前位置供下次续读
+            events = subscription.get(timeout if since is not None else 0)
+        finally:
+            subscription.close()
+        
+        last_event_id = max((event['id'] for event in events if event['id'] is not None), default=None)
+        if last_event_id is None:
+            last_event_id = since if since is not None else event_bus.last_event_id(user_id) or 0
+        
+        return jsonify({
+            'success': True,
+            'data': events,
+            'last_event_id': last_event_id
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@events_bp.route('/events/stats', methods=['GET'])
+def get_event_stats():
+    """获取实时事件连接统计"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': event_bus.stats()
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
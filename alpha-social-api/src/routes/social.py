@@ -4,62 +4,49 @@
 """
 
 from flask import Blueprint, request, jsonify
+from sqlalchemy.dialects.sqlite import insert
 from src.models.user import db
-from src.models.blockchain import blockchain_client
-from datetime import datetime
+from src.models.social import Follow, PrivateMessage, conversation_key
+from src.models.outbox import tx_outbox
+from src.models.pagination import apply_cursor, decode_cursor, encode_cursor, next_cursor
+from src.models.timeline import home_timeline
+from src.models.membership import membership_index
+from src.models.user_stats import user_stats
+from src.models.conversations import conversation_summaries
+from src.models.events import event_bus
+from src.models.graph import follow_graph
+from datetime import datetime, timezone
 import json
 
 social_bp = Blueprint('social', __name__)
 
-# 关注关系模型（简化版，实际应该在models中定义）
-class Follow(db.Model):
-    """关注关系模型"""
-    __tablename__ = 'follows'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    follower_id = db.Column(db.String(64), nullable=False, index=True)
-    followed_id = db.Column(db.String(64), nullable=False, index=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+# 批量关注、取消关注的单次请求上限
+MAX_BATCH_SIZE = 500
+
+def _batch_targets(data):
+    """解析批量关注请求，返回 (关注者, 去重后的目标列表, 错误信息)"""
+    follower_id = data.get('follower_id')
+    followed_ids = data.get('followed_ids')
     
-    # 复合唯一索引，防止重复关注
-    __table_args__ = (db.UniqueConstraint('follower_id', 'followed_id'),)
+    if not follower_id:
+        return None, None, 'Missing follower_id'
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'follower_id': self.follower_id,
-            'followed_id': self.followed_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
-
-class PrivateMessage(db.Model):
-    """私聊消息模型"""
-    __tablename__ = 'private_messages'
+    if not isinstance(followed_ids, list) or not followed_ids or \
+            not all(isinstance(followed_id, str) and followed_id for followed_id in followed_ids):
+        return None, None, 'followed_ids must be a non-empty list of user ids'
     
-    id = db.Column(db.Integer, primary_key=True)
-    sender_id = db.Column(db.String(64), nullable=False, index=True)
-    recipient_id = db.Column(db.String(64), nullable=False, index=True)
-    content = db.Column(db.Text, nullable=False)
-    content_hash = db.Column(db.String(64))  # 区块链上的内容哈希
-    message_type = db.Column(db.String(20), default='text')  # text, image, file
-    is_read = db.Column(db.Boolean, default=False)
-    is_deleted_by_sender = db.Column(db.Boolean, default=False)
-    is_deleted_by_recipient = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-    read_at = db.Column(db.DateTime)
+    if len(followed_ids) > MAX_BATCH_SIZE:
+        return None, None, f'Too many followed_ids, maximum is {MAX_BATCH_SIZE}'
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'sender_id': self.sender_id,
-            'recipient_id': self.recipient_id,
-            'content': self.content,
-            'content_hash': self.content_hash,
-            'message_type': self.message_type,
-            'is_read': self.is_read,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'read_at': self.read_at.isoformat() if self.read_at else None
-        }
+    return follower_id, list(dict.fromkeys(followed_ids)), None
+
+def _store_message_hash(context, result):
+    """私信上链后回写链上内容哈希（不提交事务）"""
+    PrivateMessage.query.filter_by(id=context['message_id']).update(
+        {'content_hash': result.events[0]['data']['content_hash']}, synchronize_session=False
+    )
+
+tx_outbox.register_hook('send_private_message', _store_message_hash)
 
 @social_bp.route('/follow', methods=['POST'])
 def follow_user():
@@ -87,15 +74,20 @@ def follow_user():
         # 创建关注关系
         follow = Follow(follower_id=follower_id, followed_id=followed_id)
         db.session.add(follow)
+        home_timeline.on_follow(follower_id, followed_id)
+        user_stats.on_follow(follower_id, followed_id)
+        # 发送到区块链（与关注关系在同一事务中写入发件箱，由后台提交）
+        transaction = tx_outbox.enqueue('follow_user', {'follower': follower_id, 'followed': followed_id}).to_ref()
         db.session.commit()
-        
-        # 发送到区块链
-        blockchain_result = blockchain_client.follow_user(follower_id, followed_id)
+        tx_outbox.notify()
+        membership_index.on_follow(follower_id, followed_id)
+        follow_graph.on_follow(follower_id, followed_id)
+        event_bus.publish([followed_id], 'follow', follow.to_dict())
         
         return jsonify({
             'success': True,
             'data': follow.to_dict(),
-            'blockchain_tx': blockchain_result.tx_hash if blockchain_result.success else None
+            'blockchain_tx': transaction
         }), 201
         
     except Exception as e:
@@ -123,13 +115,127 @@ def unfollow_user():
         
         # 删除关注关系
         db.session.delete(follow)
+        home_timeline.on_unfollow(follower_id, followed_id)
+        user_stats.on_follow(follower_id, followed_id, -1)
         db.session.commit()
+        membership_index.on_unfollow(follower_id, followed_id)
+        follow_graph.on_unfollow(follower_id, followed_id)
         
         return jsonify({'success': True})
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@social_bp.route('/follow/batch', methods=['POST'])
+def follow_users_batch():
+    """批量关注用户，单个事务写入，区块链提交合并为一笔交易"""
+    try:
+        follower_id, followed_ids, error = _batch_targets(request.get_json() or {})
+        if error:
+            return jsonify({'error': error}), 400
+        
+        results = {}
+        targets = []
+        for followed_id in followed_ids:
+            if followed_id == follower_id:
+                results[followed_id] = 'cannot_follow_self'
+            else:
+                targets.append(followed_id)
+        
+        # 已存在的关注关系忽略，RETURNING 取回本次实际新增的目标及其ID
+        created = {}
+        if targets:
+            now = datetime.utcnow()
+            created = {
+                row.followed_id: row.id for row in db.session.execute(
+                    insert(Follow).values([
+                        {'follower_id': follower_id, 'followed_id': followed_id, 'created_at': now}
+                        for followed_id in targets
+                    ]).on_conflict_do_nothing().returning(Follow.id, Follow.followed_id)
+                )
+            }
+        
+        new_follows = [followed_id for followed_id in targets if followed_id in created]
+        home_timeline.on_follow_many(follower_id, new_follows)
+        user_stats.on_follow_many(follower_id, new_follows)
+        
+        # 发送到区块链（与关注关系在同一事务中写入发件箱，由后台提交）
+        transaction = None
+        if new_follows:
+            transaction = tx_outbox.enqueue('follow_users', {'follower': follower_id, 'followed': new_follows}).to_ref()
+        db.session.commit()
+        if transaction:
+            tx_outbox.notify()
+        
+        for followed_id in targets:
+            results[followed_id] = 'followed' if followed_id in created else 'already_following'
+        
+        for followed_id in new_follows:
+            membership_index.on_follow(follower_id, followed_id)
+            follow_graph.on_follow(follower_id, followed_id)
+            # 与单个关注的事件内容一致
+            event_bus.publish([followed_id], 'follow', Follow(
+                id=created[followed_id],
+                follower_id=follower_id,
+                followed_id=followed_id,
+                created_at=now
+            ).to_dict())
+        
+        return jsonify({
+            'success': True,
+            'data': results,
+            'summary': {
+                'total': len(followed_ids),
+                'followed': len(new_follows)
+            },
+            'blockchain_tx': transaction
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@social_bp.route('/unfollow/batch', methods=['POST'])
+def unfollow_users_batch():
+    """批量取消关注用户，单个事务删除"""
+    try:
+        follower_id, followed_ids, error = _batch_targets(request.get_json() or {})
+        if error:
+            return jsonify({'error': error}), 400
+        
+        follows = Follow.__table__
+        removed = {
+            row.followed_id for row in db.session.execute(
+                follows.delete().where(
+                    follows.c.follower_id == follower_id,
+                    follows.c.followed_id.in_(followed_ids)
+                ).returning(follows.c.followed_id)
+            )
+        }
+        
+        unfollowed = [followed_id for followed_id in followed_ids if followed_id in removed]
+        home_timeline.on_unfollow_many(follower_id, unfollowed)
+        user_stats.on_follow_many(follower_id, unfollowed, -1)
+        db.session.commit()
+        
+        for followed_id in unfollowed:
+            membership_index.on_unfollow(follower_id, followed_id)
+            follow_graph.on_unfollow(follower_id, followed_id)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                followed_id: 'unfollowed' if followed_id in removed else 'not_following'
+                for followed_id in followed_ids
+            },
+            'summary': {
+                'total': len(followed_ids),
+                'unfollowed': len(unfollowed)
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @social_bp.route('/followers/<user_id>', methods=['GET'])
 def get_followers(user_id):
     """获取用户的关注者列表"""
@@ -137,7 +243,15 @@ def get_followers(user_id):
         limit = min(int(request.args.get('limit', 20)), 100)
         offset = int(request.args.get('offset', 0))
         
-        followers = Follow.query.filter_by(followed_id=user_id).offset(offset).limit(limit).all()
+        try:
+            cursor = decode_cursor(request.args.get('cursor'))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        query = apply_cursor(Follow.query.filter_by(followed_id=user_id), Follow.created_at, Follow.id, cursor)
+        if not cursor:
+            query = query.offset(offset)
+        followers = query.limit(limit).all()
         
         return jsonify({
             'success': True,
@@ -145,7 +259,8 @@ def get_followers(user_id):
             'pagination': {
                 'limit': limit,
                 'offset': offset,
-                'has_more': len(followers) == limit
+                'has_more': len(followers) == limit,
+                'next_cursor': next_cursor(followers, limit)
             }
         })
         
@@ -159,7 +274,15 @@ def get_following(user_id):
         limit = min(int(request.args.get('limit', 20)), 100)
         offset = int(request.args.get('offset', 0))
         
-        following = Follow.query.filter_by(follower_id=user_id).offset(offset).limit(limit).all()
+        try:
+            cursor = decode_cursor(request.args.get('cursor'))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        query = apply_cursor(Follow.query.filter_by(follower_id=user_id), Follow.created_at, Follow.id, cursor)
+        if not cursor:
+            query = query.offset(offset)
+        following = query.limit(limit).all()
         
         return jsonify({
             'success': True,
@@ -167,7 +290,8 @@ def get_following(user_id):
             'pagination': {
                 'limit': limit,
                 'offset': offset,
-                'has_more': len(following) == limit
+                'has_more': len(following) == limit,
+                'next_cursor': next_cursor(following, limit)
             }
         })
         
@@ -184,10 +308,15 @@ def get_follow_status():
         if not follower_id or not followed_id:
             return jsonify({'error': 'Missing follower_id or followed_id'}), 400
         
-        is_following = Follow.query.filter_by(
-            follower_id=follower_id,
-            followed_id=followed_id
-        ).first() is not None
+        # 索引确定未关注时不查询数据库，其余情况以数据库为准
+        is_following = membership_index.is_following(follower_id, followed_id)
+        if is_following is not False:
+            is_following = Follow.query.filter_by(
+                follower_id=follower_id,
+                followed_id=followed_id
+            ).first() is not None
+            if not is_following:
+                membership_index.on_unfollow(follower_id, followed_id)
         
         return jsonify({
             'success': True,
@@ -222,21 +351,22 @@ def send_message():
         )
         
         db.session.add(message)
+        user_stats.on_message_sent(sender_id, recipient_id)
+        conversation_summaries.on_message_sent(message)
+        # 发送到区块链（与消息在同一事务中写入发件箱，提交成功后回写内容哈希）
+        transaction = tx_outbox.enqueue('send_private_message', {
+            'sender': sender_id,
+            'recipient': recipient_id,
+            'content_hash': message.content_hash or content[:64]
+        }, context={'message_id': message.id}).to_ref()
         db.session.commit()
-        
-        # 发送到区块链
-        blockchain_result = blockchain_client.send_private_message(
-            sender_id, recipient_id, message.content_hash or content[:64]
-        )
-        
-        if blockchain_result.success:
-            message.content_hash = blockchain_result.events[0]['data']['content_hash']
-            db.session.commit()
+        tx_outbox.notify()
+        event_bus.publish([recipient_id, sender_id], 'message', message.to_dict())
         
         return jsonify({
             'success': True,
             'data': message.to_dict(),
-            'blockchain_tx': blockchain_result.tx_hash if blockchain_result.success else None
+            'blockchain_tx': transaction
         }), 201
         
     except Exception as e:
@@ -260,54 +390,114 @@ def mark_message_read(message_id):
         if not message:
             return jsonify({'error': 'Message not found'}), 404
         
-        message.is_read = True
-        message.read_at = datetime.utcnow()
+        # 以条件更新判断本次是否由未读变为已读，并在同一语句中取回删除状态，避免并发请求重复扣减未读数
+        messages = PrivateMessage.__table__
+        updated = db.session.execute(
+            messages.update().where(
+                messages.c.id == message_id,
+                messages.c.is_read == False
+            ).values(is_read=True, read_at=datetime.utcnow()).returning(messages.c.is_deleted_by_recipient)
+        ).first()
+        if updated and not updated.is_deleted_by_recipient:
+            user_stats.on_messages_read(user_id)
+            conversation_summaries.on_message_read(user_id, message.sender_id)
         db.session.commit()
         
+        if updated:
+            event_bus.publish([message.sender_id], 'message_read', {
+                'reader_id': user_id,
+                'message_ids': [message_id]
+            })
+        
         return jsonify({'success': True})
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@social_bp.route('/conversations/<user_id>/<partner_id>/read', methods=['POST'])
+def mark_conversation_read(user_id, partner_id):
+    """将对话中截至指定消息ID或时间的未读消息一次性标记为已读"""
+    try:
+        data = request.get_json() or {}
+        up_to_id = data.get('up_to_id')
+        up_to = data.get('up_to')
+        
+        if up_to_id is None and up_to is None:
+            return jsonify({'error': 'Missing up_to_id or up_to'}), 400
+        
+        if up_to_id is not None and not isinstance(up_to_id, int):
+            return jsonify({'error': 'up_to_id must be an integer'}), 400
+        
+        if up_to is not None:
+            try:
+                up_to = datetime.fromisoformat(up_to)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Invalid up_to timestamp'}), 400
+            if up_to.tzinfo:
+                up_to = up_to.astimezone(timezone.utc).replace(tzinfo=None)
+        
+        messages = PrivateMessage.__table__
+        conditions = [
+            messages.c.conversation_key == conversation_key(user_id, partner_id),
+            messages.c.sender_id == partner_id,
+            messages.c.recipient_id == user_id,
+            messages.c.is_read == False
+        ]
+        if up_to_id is not None:
+            conditions.append(messages.c.id <= up_to_id)
+        if up_to is not None:
+            conditions.append(messages.c.created_at <= up_to)
+        
+        # 单条UPDATE标记全部消息，RETURNING 取回删除标记以便只扣减仍可见的未读数
+        updated = db.session.execute(
+            messages.update().where(*conditions).values(
+                is_read=True, read_at=datetime.utcnow()
+            ).returning(messages.c.id, messages.c.is_deleted_by_recipient)
+        ).all()
+        
+        unread = sum(1 for row in updated if not row.is_deleted_by_recipient)
+        user_stats.on_messages_read(user_id, unread)
+        conversation_summaries.on_message_read(user_id, partner_id, unread)
+        db.session.commit()
+        
+        if updated:
+            event_bus.publish([partner_id], 'message_read', {
+                'reader_id': user_id,
+                'message_ids': sorted(row.id for row in updated)
+            })
+        
+        return jsonify({
+            'success': True,
+            'data': {'marked_read': unread}
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @social_bp.route('/conversations/<user_id>', methods=['GET'])
 def get_conversations(user_id):
     """获取用户的对话列表"""
     try:
-        # 获取用户参与的所有对话
-        conversations = db.session.query(PrivateMessage).filter(
-            db.or_(
-                PrivateMessage.sender_id == user_id,
-                PrivateMessage.recipient_id == user_id
-            )
-        ).filter(
-            db.and_(
-                PrivateMessage.is_deleted_by_sender == False,
-                PrivateMessage.is_deleted_by_recipient == False
-            )
-        ).order_by(PrivateMessage.created_at.desc()).all()
+        limit = min(int(request.args.get('limit', 20)), 100)
+        offset = int(request.args.get('offset', 0))
         
-        # 按对话伙伴分组，只保留最新的消息
-        conversation_dict = {}
-        for message in conversations:
-            partner_id = message.recipient_id if message.sender_id == user_id else message.sender_id
-            
-            if partner_id not in conversation_dict:
-                conversation_dict[partner_id] = {
-                    'partner_id': partner_id,
-                    'last_message': message.to_dict(),
-                    'unread_count': 0
-                }
-            
-            # 计算未读消息数
-            if message.recipient_id == user_id and not message.is_read:
-                conversation_dict[partner_id]['unread_count'] += 1
+        try:
+            cursor = decode_cursor(request.args.get('cursor'))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
         
-        conversations_list = list(conversation_dict.values())
-        conversations_list.sort(key=lambda x: x['last_message']['created_at'], reverse=True)
+        # 从会话摘要表按最后消息时间分页读取
+        conversations, cursor_token = conversation_summaries.list(user_id, limit, offset, cursor)
         
         return jsonify({
             'success': True,
-            'data': conversations_list
+            'data': conversations,
+            'pagination': {
+                'limit': limit,
+                'offset': offset,
+                'has_more': cursor_token is not None,
+                'next_cursor': cursor_token
+            }
         })
         
     except Exception as e:
@@ -315,12 +505,23 @@ def get_conversations(user_id):
 
 @social_bp.route('/conversations/<user_id>/<partner_id>/messages', methods=['GET'])
 def get_conversation_messages(user_id, partner_id):
-    """获取与特定用户的对话消息"""
+    """获取与特定用户的对话消息，before（或 cursor）加载更早的消息，after 加载更新的消息"""
     try:
         limit = min(int(request.args.get('limit', 50)), 100)
         offset = int(request.args.get('offset', 0))
         
-        messages = PrivateMessage.query.filter(
+        try:
+            before = decode_cursor(request.args.get('before') or request.args.get('cursor'))
+            after = decode_cursor(request.args.get('after'))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        if before and after:
+            return jsonify({'error': 'Cannot combine before and after cursors'}), 400
+        
+        # 按会话键走 (conversation_key, created_at, id) 索引，收发方向与删除标记作为剩余过滤条件
+        query = PrivateMessage.query.filter(
+            PrivateMessage.conversation_key == conversation_key(user_id, partner_id),
             db.or_(
                 db.and_(
                     PrivateMessage.sender_id == user_id,
@@ -333,10 +534,23 @@ def get_conversation_messages(user_id, partner_id):
                     PrivateMessage.is_deleted_by_recipient == False
                 )
             )
-        ).order_by(PrivateMessage.created_at.desc()).offset(offset).limit(limit).all()
+        )
         
-        # 反转顺序，使最新消息在最后
-        messages.reverse()
+        if after:
+            # 按时间正序取游标之后的新消息
+            messages = apply_cursor(query, PrivateMessage.created_at, PrivateMessage.id, after, reverse=True).limit(limit).all()
+            cursor_token = next_cursor(messages, limit)
+        else:
+            query = apply_cursor(query, PrivateMessage.created_at, PrivateMessage.id, before)
+            if not before:
+                query = query.offset(offset)
+            messages = query.limit(limit).all()
+            
+            # 游标指向本页最早的消息，用于继续加载更早的历史
+            cursor_token = next_cursor(messages, limit)
+            
+            # 反转顺序，使最新消息在最后
+            messages.reverse()
         
         return jsonify({
             'success': True,
@@ -344,7 +558,10 @@ def get_conversation_messages(user_id, partner_id):
             'pagination': {
                 'limit': limit,
                 'offset': offset,
-                'has_more': len(messages) == limit
+                'has_more': len(messages) == limit,
+                'next_cursor': cursor_token,
+                'before_cursor': encode_cursor(messages[0].created_at, messages[0].id) if messages else None,
+                'after_cursor': encode_cursor(messages[-1].created_at, messages[-1].id) if messages else None
             }
         })
         
@@ -368,8 +585,21 @@ def delete_message(message_id):
         # 根据用户身份标记删除
         if message.sender_id == user_id:
             message.is_deleted_by_sender = True
+            conversation_summaries.on_message_deleted(user_id, message.recipient_id, message_id)
         elif message.recipient_id == user_id:
-            message.is_deleted_by_recipient = True
+            messages = PrivateMessage.__table__
+            updated = db.session.execute(
+                messages.update().where(
+                    messages.c.id == message_id,
+                    messages.c.is_deleted_by_recipient == False
+                ).values(is_deleted_by_recipient=True).returning(messages.c.is_read)
+            ).first()
+            if updated and not updated.is_read:
+                user_stats.on_messages_read(user_id)
+            if updated:
+                conversation_summaries.on_message_deleted(
+                    user_id, message.sender_id, message_id, was_unread=not updated.is_read
+                )
         else:
             return jsonify({'error': 'Unauthorized'}), 403
         
@@ -384,27 +614,10 @@ def delete_message(message_id):
 def get_social_stats(user_id):
     """获取用户社交统计"""
     try:
-        followers_count = Follow.query.filter_by(followed_id=user_id).count()
-        following_count = Follow.query.filter_by(follower_id=user_id).count()
-        
-        # 获取消息统计
-        sent_messages = PrivateMessage.query.filter_by(sender_id=user_id).count()
-        received_messages = PrivateMessage.query.filter_by(recipient_id=user_id).count()
-        unread_messages = PrivateMessage.query.filter_by(
-            recipient_id=user_id,
-            is_read=False,
-            is_deleted_by_recipient=False
-        ).count()
-        
+        # 计数随关注、私信写操作增量维护，这里只读取计数表
         return jsonify({
             'success': True,
-            'data': {
-                'followers_count': followers_count,
-                'following_count': following_count,
-                'sent_messages': sent_messages,
-                'received_messages': received_messages,
-                'unread_messages': unread_messages
-            }
+            'data': user_stats.get(user_id)
         })
         
     except Exception as e:
@@ -418,16 +631,17 @@ def get_mutual_follows():
         if not user_id:
             return jsonify({'error': 'Missing user_id parameter'}), 400
         
-        # 查找互相关注的用户
-        mutual_follows = db.session.query(Follow.followed_id).filter(
-            Follow.follower_id == user_id
-        ).intersect(
-            db.session.query(Follow.follower_id).filter(
-                Follow.followed_id == user_id
-            )
-        ).all()
-        
-        mutual_follow_ids = [follow[0] for follow in mutual_follows]
+        # 查找互相关注的用户，关系图不可用时查询数据库
+        mutual_follow_ids = follow_graph.mutual_follows(user_id)
+        if mutual_follow_ids is None:
+            mutual_follows = db.session.query(Follow.followed_id).filter(
+                Follow.follower_id == user_id
+            ).intersect(
+                db.session.query(Follow.follower_id).filter(
+                    Follow.followed_id == user_id
+                )
+            ).all()
+            mutual_follow_ids = [follow[0] for follow in mutual_follows]
         
         return jsonify({
             'success': True,
@@ -443,7 +657,17 @@ def get_suggested_users(user_id):
     try:
         limit = min(int(request.args.get('limit', 10)), 50)
         
-        # 简单的推荐算法：推荐关注者的关注者
+        # 推荐关注的人所关注的用户，按共同关注人数排序
+        suggestions = follow_graph.suggestions(user_id, limit)
+        if suggestions is not None:
+            return jsonify({
+                'success': True,
+                'data': [suggested_id for suggested_id, _ in suggestions],
+                'common_counts': {suggested_id: count for suggested_id, count in suggestions},
+                'algorithm': follow_graph.algorithm
+            })
+        
+        # 关系图不可用时退回数据库查询：推荐关注者的关注者
         suggested_users = db.session.query(Follow.followed_id).filter(
             Follow.follower_id.in_(
                 db.session.query(Follow.followed_id).filter(
@@ -0,0 +1,25 @@
+"""
+链上交易API路由
+查询发件箱中链上交易的提交状态
+"""
+
+from flask import Blueprint, jsonify
+from src.models.outbox import tx_outbox
+
+transactions_bp = Blueprint('transactions', __name__)
+
+@transactions_bp.route('/tx/<int:tx_id>', methods=['GET'])
+def get_transaction(tx_id):
+    """获取链上交易的提交状态"""
+    try:
+        transaction = tx_outbox.get(tx_id)
+        if not transaction:
+            return jsonify({'error': 'Transaction not found'}), 404
+
+        return jsonify({
+            'success': True,
+            'data': transaction.to_dict()
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,40 @@
+"""
+测试公共夹具
+应用在导入时创建，测试使用临时目录中的独立数据库，不改动 src/database/app.db
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.main import app as flask_app  # noqa: E402
+
+@pytest.fixture
+def app():
+    return flask_app
+
+@pytest.fixture
+def client():
+    return flask_app.test_client()
+
+@pytest.fixture
+def user_id():
+    """每个测试使用不重复的用户ID，避免共享数据库中的数据互相影响"""
+    return f'user-{uuid.uuid4().hex[:12]}'
+
+def create_content(client, author_id, **fields):
+    """发布一条内容并返回其ID"""
+    response = client.post('/api/contents', json={
+        'author_id': author_id,
+        'content_type': 'text',
+        'content_data': fields.pop('content_data', {'text': uuid.uuid4().hex}),
+        **fields
+    })
+    assert response.status_code == 201
+    return response.get_json()['data']['id']
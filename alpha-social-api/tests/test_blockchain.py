@@ -0,0 +1,64 @@
+"""
+区块链客户端测试
+"""
+
+import time
+
+from flask import Flask
+
+from src.models.blockchain import AlphaBlockchainClient, BlockchainConfig
+from src.models.rpc import AsyncRPCTransport
+
+def init_client(**config):
+    """创建客户端并记录启动的后台任务，不实际连接节点"""
+    app = Flask(__name__)
+    app.config.update(config)
+    client = AlphaBlockchainClient()
+    started = []
+    client.transport.start_health_checks = lambda: started.append('health_checks')
+    client.heads.start = lambda: started.append('heads')
+    client.init_app(app)
+    return client, started
+
+def test_background_tasks_start_on_first_use():
+    client, started = init_client()
+    assert client.transport._loop is None
+    assert started == []
+
+    try:
+        client.transport._ensure_loop()
+        assert started == ['heads']
+        client.transport._ensure_loop()
+        assert started == ['heads']
+    finally:
+        client.transport.shutdown()
+
+def test_health_checks_require_configured_endpoints():
+    client, started = init_client(
+        BLOCKCHAIN_RPC_URLS=['http://127.0.0.1:9933', 'http://127.0.0.1:9934'],
+        CHAIN_HEAD_SUBSCRIPTION=False
+    )
+    assert started == []
+
+    try:
+        client.transport._ensure_loop()
+        assert started == ['health_checks']
+    finally:
+        client.transport.shutdown()
+
+def test_unexpected_send_error_resolves_batched_calls():
+    transport = AsyncRPCTransport(BlockchainConfig(rpc_timeout=5.0))
+    in_flight = []
+
+    async def failing_send(pending):
+        in_flight.extend(transport._tasks)
+        raise KeyError('boom')
+    transport._send = failing_send
+
+    try:
+        started = time.monotonic()
+        assert transport.call_sync('system_chain') == {'error': "'boom'"}
+        assert time.monotonic() - started < 1
+        assert len(in_flight) == 1
+    finally:
+        transport.shutdown()
@@ -0,0 +1,104 @@
+"""
+内容接口测试
+"""
+
+import threading
+
+from sqlalchemy import event
+
+from conftest import create_content
+from src.models.counters import StatCounter, stat_counters
+from src.models.user import db
+
+def total_contents(client):
+    return client.get('/api/stats').get_json()['data']['total_contents']
+
+def test_delete_content_twice_adjusts_counter_once(client, user_id):
+    content_id = create_content(client, user_id)
+    before = total_contents(client)
+
+    response = client.delete(f'/api/contents/{content_id}', json={'author_id': user_id})
+    assert response.status_code == 200
+    assert total_contents(client) == before - 1
+
+    response = client.delete(f'/api/contents/{content_id}', json={'author_id': user_id})
+    assert response.status_code == 404
+    assert total_contents(client) == before - 1
+
+def test_batch_create_maps_ids_to_items(client, user_id):
+    items = [
+        {'author_id': user_id, 'content_type': 'text', 'content_data': {'n': 1}, 'title': 'first'},
+        {'author_id': user_id, 'content_type': 'text'},
+        'not an object',
+        {'author_id': user_id, 'content_type': 'text', 'content_data': {'n': 1}, 'title': 'duplicate'},
+        {'author_id': user_id, 'content_type': 'text', 'content_data': {'n': 2}, 'tags': 'x'},
+        {'author_id': user_id, 'content_type': 'text', 'content_data': {'n': 3}, 'title': 'third'},
+    ]
+    response = client.post('/api/contents/batch', json={'items': items})
+    assert response.status_code == 201
+    results = response.get_json()['data']
+
+    assert [result['index'] for result in results] == list(range(len(items)))
+    assert [result['success'] for result in results] == [True, False, False, True, False, True]
+    assert results[1]['error'] == 'Missing required field: content_data'
+    assert results[2]['error'] == 'Item must be an object'
+    assert results[4]['error'] == 'tags must be a list'
+
+    created = {index: results[index]['data'] for index in (0, 3, 5)}
+    assert len({data['id'] for data in created.values()}) == 3
+    assert len({data['content_hash'] for data in created.values()}) == 3
+    for index, data in created.items():
+        content = client.get(f"/api/contents/{data['id']}").get_json()['data']
+        assert content['title'] == items[index]['title']
+        assert content['content_data'] == items[index]['content_data']
+        assert content['content_hash'] == data['content_hash']
+
+def test_batch_create_rejects_invalid_batches(client, user_id):
+    item = {'author_id': user_id, 'content_type': 'text', 'content_data': {'n': 1}}
+
+    response = client.post('/api/contents/batch', json={'items': [item] * 501})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Too many items, maximum is 500'
+
+    response = client.post('/api/contents/batch', json={'items': []})
+    assert response.status_code == 400
+
+    response = client.post('/api/contents/batch', json={'items': [{'author_id': user_id}]})
+    assert response.status_code == 400
+    assert response.get_json()['data'][0]['success'] is False
+
+def test_batch_create_accepts_full_batch(client, user_id):
+    items = [{'author_id': user_id, 'content_type': 'text', 'content_data': {'n': index}} for index in range(500)]
+    response = client.post('/api/contents/batch', json={'items': items})
+    assert response.status_code == 201
+    results = response.get_json()['data']
+    assert all(result['success'] for result in results)
+
+    ids = [result['data']['id'] for result in results]
+    assert len(set(ids)) == 500
+    for index in (0, 250, 499):
+        assert client.get(f'/api/contents/{ids[index]}').get_json()['data']['content_data'] == {'n': index}
+
+def test_reconcile_corrects_drift_with_a_single_read(app, client, user_id):
+    create_content(client, user_id)
+    expected = total_contents(client)
+
+    with app.app_context():
+        StatCounter.query.filter_by(name='contents', bucket='').update({'value': StatCounter.value + 5})
+        db.session.commit()
+        assert total_contents(client) == expected + 5
+
+        statements = []
+        thread = threading.current_thread()
+        def record(conn, cursor, statement, *args):
+            if threading.current_thread() is thread:
+                statements.append(statement.split()[0])
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            stat_counters.reconcile()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert total_contents(client) == expected
+    # 统计只读，写入只有一次增量更新
+    assert statements[0] in ('SELECT', 'WITH') and statements[1:] == ['INSERT']
@@ -0,0 +1,23 @@
+"""
+关注关系图测试
+"""
+
+from src.models.graph import follow_graph
+from src.models.social import Follow
+from src.models.user import db
+
+def mutual_follows(client, user_id):
+    return client.get(f'/api/mutual-follows?user_id={user_id}').get_json()['data']
+
+def test_rebuild_picks_up_follows_written_by_other_worker(app, client, user_id):
+    other_id = f'{user_id}-other'
+    client.post('/api/follow', json={'follower_id': user_id, 'followed_id': other_id})
+    with app.app_context():
+        # 直接写入数据库，模拟其他进程的写入（本进程的关系图不会更新）
+        db.session.add(Follow(follower_id=other_id, followed_id=user_id))
+        db.session.commit()
+    assert mutual_follows(client, user_id) == []
+
+    with app.app_context():
+        follow_graph.rebuild()
+    assert mutual_follows(client, user_id) == [other_id]
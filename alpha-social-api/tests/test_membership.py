@@ -0,0 +1,123 @@
+"""
+点赞、关注状态检查测试
+"""
+
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from conftest import create_content
+from src.models.content import Like
+from src.models.membership import membership_index
+from src.models.social import Follow
+from src.models.user import db
+
+def insert_from_other_worker(app, *rows):
+    """直接写入数据库，模拟其他进程的写入（本进程的索引不会更新）"""
+    with app.app_context():
+        db.session.add_all(rows)
+        db.session.commit()
+
+def delete_from_other_worker(app, model, **filters):
+    """直接从数据库删除，模拟其他进程的删除"""
+    with app.app_context():
+        model.query.filter_by(**filters).delete()
+        db.session.commit()
+
+def sync_index(app):
+    with app.app_context():
+        membership_index.sync()
+
+@contextmanager
+def count_queries(app):
+    """统计执行的SQL语句数"""
+    statements = []
+    thread = threading.current_thread()
+    def record(conn, cursor, statement, *args):
+        if threading.current_thread() is thread:
+            statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+def test_negatives_are_answered_without_queries(app, client, user_id):
+    content_id = create_content(client, user_id)
+    client.post('/api/follow', json={'follower_id': user_id, 'followed_id': f'{user_id}-other'})
+    sync_index(app)
+
+    with count_queries(app) as statements:
+        response = client.post('/api/like-status/bulk', json={'user_id': user_id, 'target_ids': [content_id]})
+        assert response.get_json()['data'] == {str(content_id): False}
+        response = client.get(f'/api/follow-status?follower_id={user_id}-other&followed_id={user_id}')
+        assert response.get_json()['data']['is_following'] is False
+    assert statements == []
+
+def test_like_written_by_other_worker_is_reported(app, client, user_id):
+    liked_here = create_content(client, user_id)
+    liked_elsewhere = create_content(client, user_id)
+    not_liked = create_content(client, user_id)
+
+    client.post(f'/api/contents/{liked_here}/like', json={'user_id': user_id})
+    insert_from_other_worker(app, Like(user_id=user_id, target_type='content', target_id=liked_elsewhere))
+    sync_index(app)
+
+    response = client.post('/api/like-status/bulk', json={
+        'user_id': user_id,
+        'target_ids': [liked_here, liked_elsewhere, not_liked]
+    })
+    assert response.get_json()['data'] == {
+        str(liked_here): True,
+        str(liked_elsewhere): True,
+        str(not_liked): False
+    }
+
+def test_follow_written_by_other_worker_is_reported(app, client, user_id):
+    insert_from_other_worker(app, Follow(follower_id=user_id, followed_id=f'{user_id}-other'))
+    sync_index(app)
+
+    response = client.get(f'/api/follow-status?follower_id={user_id}&followed_id={user_id}-other')
+    assert response.get_json()['data']['is_following'] is True
+
+def test_removal_by_other_worker_is_confirmed(app, client, user_id):
+    content_id = create_content(client, user_id)
+    client.post(f'/api/contents/{content_id}/like', json={'user_id': user_id})
+    client.post('/api/follow', json={'follower_id': user_id, 'followed_id': f'{user_id}-other'})
+    delete_from_other_worker(app, Like, user_id=user_id, target_id=content_id)
+    delete_from_other_worker(app, Follow, follower_id=user_id)
+
+    response = client.post('/api/like-status/bulk', json={'user_id': user_id, 'target_ids': [content_id]})
+    assert response.get_json()['data'] == {str(content_id): False}
+    response = client.get(f'/api/follow-status?follower_id={user_id}&followed_id={user_id}-other')
+    assert response.get_json()['data']['is_following'] is False
+
+    # 确认不存在后从索引中移除
+    assert membership_index.is_liked(user_id, 'content', content_id) is False
+    assert membership_index.is_following(user_id, f'{user_id}-other') is False
+
+def test_index_is_bounded(app, client, user_id):
+    content_id = create_content(client, user_id)
+    max_entries = membership_index.config.max_entries
+    membership_index.config.max_entries = 0
+    try:
+        client.post(f'/api/contents/{content_id}/like', json={'user_id': user_id})
+        stats = membership_index.stats()
+        assert stats['complete'] is False
+        assert stats['authoritative'] is False
+        assert membership_index.is_liked(user_id, 'content', content_id) is None
+
+        response = client.post('/api/like-status/bulk', json={'user_id': user_id, 'target_ids': [content_id]})
+        assert response.get_json()['data'] == {str(content_id): True}
+    finally:
+        membership_index.config.max_entries = max_entries
+        with app.app_context():
+            membership_index.warm_up()
+
+def test_bulk_like_status_rejects_booleans(client, user_id):
+    response = client.post('/api/like-status/bulk', json={'user_id': user_id, 'target_ids': [1, True]})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'target_ids must be a list of integers'
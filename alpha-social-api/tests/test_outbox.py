@@ -0,0 +1,83 @@
+"""
+链上交易发件箱测试
+"""
+
+import threading
+import time
+
+from sqlalchemy import event
+
+from conftest import create_content
+from src.models.content import Content, db
+from src.models.outbox import tx_outbox
+
+def test_like_writes_outbox_transaction(client, user_id):
+    content_id = create_content(client, user_id)
+
+    response = client.post(f'/api/contents/{content_id}/like', json={'user_id': user_id})
+    blockchain_tx = response.get_json()['data']['blockchain_tx']
+    assert blockchain_tx['status'] == 'pending'
+
+    transaction = client.get(f"/api/tx/{blockchain_tx['id']}").get_json()['data']
+    assert transaction['kind'] == 'like_post'
+
+    response = client.post(f'/api/contents/{content_id}/like', json={'user_id': user_id})
+    assert response.get_json()['data'] == {'is_liked': False, 'blockchain_tx': None}
+
+def test_content_is_not_created_without_outbox_transaction(app, client, user_id, monkeypatch):
+    def failing_enqueue(*args, **kwargs):
+        raise RuntimeError('outbox unavailable')
+    monkeypatch.setattr(tx_outbox, 'enqueue', failing_enqueue)
+
+    response = client.post('/api/contents', json={'author_id': user_id, 'content_type': 'text', 'content_data': {'n': 1}})
+    assert response.status_code == 500
+    response = client.post('/api/contents/batch', json={'items': [
+        {'author_id': user_id, 'content_type': 'text', 'content_data': {'n': 2}}
+    ]})
+    assert response.status_code == 500
+
+    with app.app_context():
+        assert Content.query.filter_by(author_id=user_id).count() == 0
+
+def wait_for_transaction(client, transaction_id, done, timeout=5.0):
+    """等待后台工作线程处理交易，直到 done(交易) 成立"""
+    deadline = time.monotonic() + timeout
+    while True:
+        transaction = client.get(f'/api/tx/{transaction_id}').get_json()['data']
+        if done(transaction) or time.monotonic() > deadline:
+            return transaction
+        tx_outbox.notify()
+        time.sleep(0.05)
+
+def test_hook_failure_does_not_resubmit(client, user_id, monkeypatch):
+    def failing_hook(context, result):
+        raise RuntimeError('hook failed')
+    monkeypatch.setitem(tx_outbox._hooks, 'like_post', failing_hook)
+
+    content_id = create_content(client, user_id)
+    response = client.post(f'/api/contents/{content_id}/like', json={'user_id': user_id})
+    # 提交状态先保存，回调失败的错误随后记录
+    transaction = wait_for_transaction(
+        client, response.get_json()['data']['blockchain_tx']['id'], lambda transaction: transaction['error']
+    )
+
+    assert transaction['status'] == 'submitted'
+    assert transaction['tx_hash']
+    assert transaction['attempts'] == 1
+    assert transaction['error'] == 'Hook failed: hook failed'
+
+def test_idle_poll_takes_no_write_lock(app):
+    with app.app_context():
+        while tx_outbox.process_one():
+            pass
+        statements = []
+        thread = threading.current_thread()
+        def record(conn, cursor, statement, *args):
+            if threading.current_thread() is thread:
+                statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            assert tx_outbox.process_one() is False
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    assert [statement.split()[0] for statement in statements] == ['SELECT']
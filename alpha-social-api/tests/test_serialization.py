@@ -0,0 +1,64 @@
+"""
+内容列表序列化测试
+"""
+
+import pytest
+from flask import jsonify
+
+from conftest import create_content
+from src.models.content import Content, db
+from src.models.serialization import content_serializer
+
+def load_contents(content_ids):
+    rows = {content.id: content for content in Content.query.filter(Content.id.in_(content_ids)).all()}
+    return [rows[content_id] for content_id in content_ids]
+
+def test_list_response_matches_jsonify(app, client, user_id):
+    content_ids = [
+        create_content(client, user_id, title='plain', content_data={'text': 'hello', 'n': 1}),
+        create_content(client, user_id, title='中文 "quoted" \\ title', description='emoji 😀',
+                       content_data={'z': [1, 2.5, None, True], 'a': {'nested': 'é'}}, tags=['b', 'a']),
+        create_content(client, user_id, content_data={'text': 'private'}, is_public=False),
+        create_content(client, user_id, content_data={'text': 'legacy'}),
+    ]
+
+    with app.app_context():
+        # 模拟规范化之前写入的历史数据
+        Content.query.filter_by(id=content_ids[3]).update({
+            'content_data': '{"text": "legacy", "b": [1, 2], "a": "é"}',
+            'tags': '["x", "y"]',
+            'json_normalized': None
+        })
+        db.session.commit()
+
+    extras = [
+        None,
+        lambda content: {'view_count': content.view_count + 5},
+        lambda content: {'is_liked': content.id % 2 == 0},
+        lambda content: {'view_count': 7, 'is_liked': False, 'zz_extra': {'k': [1]}, 'aa_extra': None},
+    ]
+    fields = {'success': True, 'pagination': {'limit': 20, 'next_cursor': None}, 'meta': {'algorithm': 'x'}}
+
+    with app.test_request_context():
+        contents = load_contents(content_ids)
+        for extra in extras:
+            expected = []
+            for content in contents:
+                item = content.to_dict()
+                if extra:
+                    item.update(extra(content))
+                expected.append(item)
+
+            body = content_serializer.list_response(contents, extra=extra, **fields).get_data()
+            assert body == jsonify(data=expected, **fields).get_data()
+
+def test_list_response_errors_are_raised_before_response(app, client, user_id):
+    content_id = create_content(client, user_id)
+
+    def failing_extra(content):
+        raise RuntimeError('extra failed')
+
+    with app.test_request_context():
+        contents = load_contents([content_id])
+        with pytest.raises(RuntimeError, match='extra failed'):
+            content_serializer.list_response(contents, extra=failing_extra, success=True)
@@ -0,0 +1,26 @@
+"""
+社交接口测试
+"""
+
+from src.models.events import event_bus
+
+def follow_event(subscription):
+    events = subscription.get(timeout=0)
+    assert [event['type'] for event in events] == ['follow']
+    return events[0]['data']
+
+def test_batch_follow_events_match_single_follow(client, user_id):
+    single_target, batch_target = f'{user_id}-single', f'{user_id}-batch'
+    subscriptions = [event_bus.subscribe(single_target), event_bus.subscribe(batch_target)]
+    try:
+        client.post('/api/follow', json={'follower_id': user_id, 'followed_id': single_target})
+        client.post('/api/follow/batch', json={'follower_id': user_id, 'followed_ids': [batch_target]})
+        single, batch = [follow_event(subscription) for subscription in subscriptions]
+    finally:
+        for subscription in subscriptions:
+            subscription.close()
+
+    assert set(batch) == set(single)
+    assert batch['follower_id'] == user_id
+    assert batch['followed_id'] == batch_target
+    assert isinstance(batch['id'], int) and batch['id'] != single['id']
@@ -0,0 +1,37 @@
+"""
+热门内容测试
+"""
+
+import threading
+
+from sqlalchemy import event
+
+from conftest import create_content
+from src.models.trending import trending_engine
+from src.models.user import db
+
+def test_trending_fills_from_recent_contents_in_window(app, client, user_id):
+    liked_id = create_content(client, user_id)
+    quiet_id = create_content(client, user_id)
+    client.post(f'/api/contents/{liked_id}/like', json={'user_id': user_id})
+    trending_engine.refresh()
+
+    statements = []
+    thread = threading.current_thread()
+    def record(conn, cursor, statement, *args):
+        if threading.current_thread() is thread:
+            statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        body = client.get('/api/trending?range=24h&limit=100').get_json()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    ids = [content['id'] for content in body['data']]
+    assert ids.index(liked_id) < ids.index(quiet_id)
+    assert body['meta']['algorithm'] == f'{trending_engine.algorithm}+{trending_engine.fill_algorithm}'
+    assert body['meta']['filled'] >= 1
+    # 补足的内容来自内存中的窗口，不按点赞数对全表排序
+    assert not any('like_count DESC' in statement for statement in statements)
@@ -0,0 +1,33 @@
+"""
+浏览计数写回测试
+"""
+
+from conftest import create_content
+from src.models.content import Content
+from src.models.view_counter import view_counter
+
+def load_row(app, content_id):
+    with app.app_context():
+        content = Content.query.filter_by(id=content_id).one()
+        return content.view_count or 0, content.view_flushes
+
+def test_rows_read_around_a_flush_count_each_view_once(app, client, user_id):
+    content_id = create_content(client, user_id)
+    with app.app_context():
+        view_counter.flush()
+
+    view_counter.record(content_id, 3)
+    before = load_row(app, content_id)
+    assert before[0] + view_counter.pending(content_id, before[1]) == 3
+
+    with app.app_context():
+        view_counter.flush()
+    after = load_row(app, content_id)
+
+    # 写回前读到的行与写回后读到的行得到相同的浏览数
+    assert before[0] + view_counter.pending(content_id, before[1]) == 3
+    assert after[0] + view_counter.pending(content_id, after[1]) == 3
+
+    view_counter.record(content_id)
+    assert before[0] + view_counter.pending(content_id, before[1]) == 4
+    assert after[0] + view_counter.pending(content_id, after[1]) == 4